@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from contextlib import suppress
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run simulated accounts against the local mock gateway and report load metrics"
+    )
+    parser.add_argument("-n", "--accounts", type=int, nargs="+", default=[1, 10, 100, 1_000])
+    parser.add_argument("-d", "--duration", type=float, default=60, help="Seconds per fleet size")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument(
+        "--latency", type=float, nargs=2, default=[20, 50], metavar=("MIN_MS", "MAX_MS")
+    )
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Override a bot setting for the run, e.g. --set STARTUP_ACCOUNTS_PER_SECOND=1000",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show bot logs")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def current_rss() -> int:
+    with suppress(OSError), open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def fetch_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as response:
+        return json.load(response)
+
+
+def apply_settings(settings, overrides: list[str]):
+    for override in overrides:
+        key, _, value = override.partition("=")
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            pass
+        setattr(settings, key, value)
+
+
+async def run_fleet(args) -> dict:
+    from bot.config import settings
+
+    apply_settings(settings, [f"GRAPHQL_URL=http://127.0.0.1:{args.port}/graphql", *args.set])
+    os.chdir(tempfile.mkdtemp(prefix="memefi-bench-"))
+
+    import main
+    from bot.core.game_model import fake_query_id
+    from bot.core.scheduler import startup_ramp
+    from bot.core.session_store import session_store
+
+    latencies: list[float] = []
+
+    class TimedGraphQLClient(main.GraphQLClient):
+        async def execute(self, operation_name: str, query: str, variables: dict | None = None):
+            started_at = time.perf_counter()
+            try:
+                return await super().execute(operation_name, query, variables)
+            finally:
+                latencies.append(time.perf_counter() - started_at)
+
+    main.GraphQLClient = TimedGraphQLClient
+
+    query_ids = [fake_query_id(100_000 + idx) for idx in range(args.run)]
+    session_store.migrate(query_ids)
+    accounts = [(query_id, None) for query_id in query_ids]
+
+    stats_before = fetch_stats(args.port)
+    rss_before = current_rss()
+    cpu_before = time.process_time()
+    started_at = time.perf_counter()
+
+    fleet = asyncio.create_task(main.run_accounts(accounts))
+    await asyncio.wait({fleet}, timeout=args.duration)
+    elapsed = time.perf_counter() - started_at
+    rss_after = current_rss()
+    cpu = time.process_time() - cpu_before
+    fleet.cancel()
+    with suppress(asyncio.CancelledError):
+        await fleet
+
+    stats_after = fetch_stats(args.port)
+    requests = stats_after["requests"] - stats_before["requests"]
+    return {
+        "accounts": args.run,
+        "ready": startup_ramp.ready,
+        "seconds": elapsed,
+        "requests": requests,
+        "operations": len(latencies),
+        "requests_per_second": requests / elapsed,
+        "operations_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "cpu_ms_per_account_second": cpu / elapsed / args.run * 1000,
+        "rss_per_account": (rss_after - rss_before) / args.run,
+        "server_errors": stats_after["errors"] - stats_before["errors"],
+    }
+
+
+def start_server(args) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            str(ROOT / "benchmarks" / "mock_server.py"),
+            f"--port={args.port}",
+            "--latency",
+            *map(str, args.latency),
+            f"--error-rate={args.error_rate}",
+            f"--rate-limit-rate={args.rate_limit_rate}",
+            f"--seed={args.seed}",
+        ]
+    )
+    for _ in range(100):
+        with suppress(OSError):
+            fetch_stats(args.port)
+            return server
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Mock gateway did not start")
+
+
+def run_size(args, accounts: int) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as result_file:
+        result_path = result_file.name
+    command = [
+        sys.executable,
+        __file__,
+        f"--run={accounts}",
+        f"--result-file={result_path}",
+        f"--duration={args.duration}",
+        f"--port={args.port}",
+        *(f"--set={override}" for override in args.set),
+    ]
+    output = None if args.verbose else subprocess.DEVNULL
+    subprocess.run(command, stdout=output, stderr=output, check=True)
+    with open(result_path) as result_file:
+        result = json.load(result_file)
+    os.unlink(result_path)
+    return result
+
+
+def main():
+    args = parse_args()
+    if args.run:
+        result = asyncio.run(run_fleet(args))
+        with open(args.result_file, "w") as result_file:
+            json.dump(result, result_file)
+        return
+
+    print(
+        f"{'accounts':>9} | {'ready':>6} | {'req/s':>8} | {'ops/s':>8} | {'p50 ms':>8} | "
+        f"{'p99 ms':>8} | {'cpu ms/acct/s':>13} | {'rss/acct':>9} | {'errors':>6}"
+    )
+    for accounts in args.accounts:
+        server = start_server(args)
+        try:
+            result = run_size(args, accounts)
+        finally:
+            server.terminate()
+            server.wait()
+        print(
+            f"{result['accounts']:>9,} | {result['ready']:>6,} | "
+            f"{result['requests_per_second']:>8.1f} | {result['operations_per_second']:>8.1f} | "
+            f"{result['p50_ms']:>8.1f} | {result['p99_ms']:>8.1f} | "
+            f"{result['cpu_ms_per_account_second']:>13.3f} | "
+            f"{result['rss_per_account'] / 1024:>6.1f} KiB | {result['server_errors']:>6,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
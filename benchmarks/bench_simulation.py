@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import os
+import random
+import selectors
+import sys
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_load import apply_settings  # noqa: E402
+
+
+class VirtualClock:
+    """Zero-based clock for the event loop, with ``time`` and ``monotonic`` offset from it.
+
+    The loop must not run on an epoch-sized clock: at that magnitude asyncio's 1ns clock
+    resolution is below float precision, so timers due now never count as ready.
+    ``monotonic`` continues from the real one, so timestamps taken at import stay valid.
+    """
+
+    def __init__(self, epoch: float):
+        self.epoch = epoch
+        self.origin = time.monotonic()
+        self.elapsed = 0.0
+
+    def loop_time(self) -> float:
+        return self.elapsed
+
+    def monotonic(self) -> float:
+        return self.origin + self.elapsed
+
+    def time(self) -> float:
+        return self.epoch + self.elapsed
+
+    def advance(self, seconds: float):
+        self.elapsed += seconds
+
+
+class FastForwardSelector(selectors.DefaultSelector):
+    """Selector that skips idle waits by moving the virtual clock instead of blocking."""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout: float | None = None):
+        events = super().select(0)
+        if events or timeout is None:
+            return events or super().select(timeout)
+        if timeout > 0:
+            self.clock.advance(timeout)
+        return []
+
+
+def create_virtual_loop(clock: VirtualClock) -> asyncio.AbstractEventLoop:
+    loop = asyncio.SelectorEventLoop(FastForwardSelector(clock))
+    loop.time = clock.loop_time
+    return loop
+
+
+def install_clock(clock: VirtualClock):
+    """Point every ``time``/``monotonic`` imported by the bot at the virtual clock."""
+    for name, module in list(sys.modules.items()):
+        if module is None or not (name == "main" or name.startswith(("bot.", "helpers"))):
+            continue
+        for attribute, value in list(vars(module).items()):
+            if value is time.time:
+                setattr(module, attribute, clock.time)
+            elif value is time.monotonic:
+                setattr(module, attribute, clock.monotonic)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run a fleet of virtual accounts against an in-process game model"
+    )
+    parser.add_argument("-n", "--accounts", type=int, default=100_000)
+    parser.add_argument(
+        "-d", "--duration", type=float, default=3600, help="Simulated seconds to run"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per request")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show bot logs")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    random.seed(args.seed)
+
+    from bot.config import settings
+
+    apply_settings(settings, ["PERSIST_TOKENS=false", *args.set])
+    os.chdir(tempfile.mkdtemp(prefix="memefi-sim-"))
+
+    import main as bot_main
+    from bot.core.game_model import GameModel, fake_query_id
+    from bot.core.scheduler import startup_ramp
+    from bot.core.session_store import session_store
+    from bot.core.transport import InMemoryTransport, use_transport
+    from bot.utils import logger
+
+    if not args.verbose and hasattr(logger, "remove"):
+        logger.remove()
+
+    clock = VirtualClock(epoch=1_750_000_000.0)
+    install_clock(clock)
+    model = GameModel(seed=args.seed, clock=clock.time)
+    use_transport(lambda proxy, user_agent: InMemoryTransport(model, latency=args.latency))
+
+    query_ids = [fake_query_id(100_000 + idx) for idx in range(args.accounts)]
+    session_store.migrate(query_ids)
+    accounts = [(query_id, None) for query_id in query_ids]
+
+    async def simulate():
+        fleet = asyncio.create_task(bot_main.run_accounts(accounts))
+        await asyncio.wait({fleet}, timeout=args.duration)
+        fleet.cancel()
+        with suppress(asyncio.CancelledError):
+            await fleet
+        leftovers = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in leftovers:
+            task.cancel()
+        await asyncio.gather(*leftovers, return_exceptions=True)
+
+    loop = create_virtual_loop(clock)
+    started_at = time.perf_counter()
+    started_cpu = time.process_time()
+    try:
+        loop.run_until_complete(simulate())
+    finally:
+        loop.close()
+    wall = time.perf_counter() - started_at
+
+    coins = sum(account.coins for account in model.accounts.values())
+    bosses = sum(account.boss_level - 1 for account in model.accounts.values())
+    print(f"Seed:               {args.seed}")
+    print(f"Accounts:           {args.accounts:,} ({startup_ramp.ready:,} ready)")
+    print(f"Simulated time:     {args.duration:,.0f}s in {wall:,.1f}s wall")
+    print(f"CPU:                {time.process_time() - started_cpu:,.1f}s")
+    print(f"Operations:         {model.operations:,} ({model.operations / wall:,.0f}/s wall)")
+    print(f"Coins earned:       {coins:,}")
+    print(f"Bosses defeated:    {bosses:,}")
+
+
+if __name__ == "__main__":
+    main()
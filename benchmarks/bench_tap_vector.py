@@ -0,0 +1,38 @@
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot.utils.tap_vector import generate_tap_vector  # noqa: E402
+
+BATCH_SIZES = [10, 100, 1_000, 10_000, 50_000]
+
+
+def generate_tap_vector_loop(taps: int) -> str:
+    vector = []
+    for _ in range(taps):
+        vector.append(str(random.randint(1, 4)))
+    return ",".join(vector)
+
+
+def bench(func, taps: int) -> float:
+    timer = timeit.Timer(lambda: func(taps))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main():
+    print(f"{'taps':>8} | {'loop':>12} | {'translate':>12} | {'speedup':>8}")
+    for taps in BATCH_SIZES:
+        loop_time = bench(generate_tap_vector_loop, taps)
+        fast_time = bench(generate_tap_vector, taps)
+        print(
+            f"{taps:>8} | {loop_time * 1e6:>10.1f}us | {fast_time * 1e6:>10.1f}us | "
+            f"{loop_time / fast_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
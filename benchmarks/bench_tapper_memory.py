@@ -0,0 +1,43 @@
+import argparse
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from main import Tapper  # noqa: E402
+from bot.core.game_model import fake_query_id  # noqa: E402
+from bot.core.init_data import parse_init_data  # noqa: E402
+
+
+def measure(accounts: int) -> tuple[int, int]:
+    query_ids = [fake_query_id(100_000 + idx) for idx in range(accounts)]
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tappers = []
+    for query_id in query_ids:
+        tapper = Tapper(query_id=query_id)
+        tapper.init_data = parse_init_data(query_id)
+        tapper.session_name = tapper.init_data.username
+        tappers.append(tapper)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return after - before, len(tappers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure memory held by idle Tapper instances")
+    parser.add_argument("-n", "--accounts", type=int, nargs="+", default=[1_000, 10_000])
+    args = parser.parse_args()
+
+    print(f"{'accounts':>10} | {'total':>12} | {'per account':>12}")
+    for accounts in args.accounts:
+        total, count = measure(accounts)
+        print(f"{accounts:>10,} | {total / 1024:>9,.0f} KiB | {total / count:>8,.0f} B")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bot.core.game_model import GameModel  # noqa: E402
+
+
+class MockGateway:
+    """aiohttp stand-in for the MemeFi GraphQL gateway, backed by ``GameModel``."""
+
+    def __init__(
+        self,
+        model: GameModel,
+        latency: tuple[float, float] = (0, 0),
+        error_rate: float = 0,
+        rate_limit_rate: float = 0,
+        seed: int = 0,
+    ):
+        self.model = model
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.operations = 0
+        self.errors = 0
+
+    async def graphql(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.latency[1] > 0:
+            await asyncio.sleep(self.random.uniform(*self.latency) / 1000)
+
+        roll = self.random.random()
+        if roll < self.error_rate:
+            self.errors += 1
+            return web.Response(status=502, text="Bad Gateway")
+        if roll < self.error_rate + self.rate_limit_rate:
+            self.errors += 1
+            return web.Response(status=429, headers={"Retry-After": "1"}, text="Too Many Requests")
+
+        body = json.loads(await request.read())
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ") or None
+        operations = body if isinstance(body, list) else [body]
+        self.operations += len(operations)
+        results = [
+            self.model.execute(operation.get("operationName"), operation.get("variables"), token)
+            for operation in operations
+        ]
+        return web.json_response(results if isinstance(body, list) else results[0])
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "operations": self.operations,
+                "errors": self.errors,
+                "accounts": len(self.model.accounts),
+            }
+        )
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/graphql", self.graphql)
+        app.router.add_get("/stats", self.stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the MemeFi GraphQL gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--latency", type=float, nargs=2, default=[0, 0], metavar=("MIN_MS", "MAX_MS")
+    )
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of HTTP 502 replies")
+    parser.add_argument(
+        "--rate-limit-rate", type=float, default=0, help="Share of HTTP 429 replies"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    gateway = MockGateway(
+        GameModel(seed=args.seed),
+        latency=tuple(args.latency),
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    web.run_app(gateway.create_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import asyncio
+import socket
+from time import monotonic
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+from aiohttp_proxy import ProxyConnector
+
+from bot.config import settings
+from bot.core.TLS import TLSv1_3_BYPASS
+
+
+class CachingResolver(AbstractResolver):
+    """DNS resolver whose cache is shared by every connector in the process."""
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+        self._resolver = DefaultResolver()
+        self._cache: dict[tuple, tuple[float, list]] = {}
+        self._inflight: dict[tuple, asyncio.Task] = {}
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> list:
+        key = (host, port, family)
+        cached = self._cache.get(key)
+        if cached and monotonic() < cached[0]:
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._resolver.resolve(host, port, family))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        hosts = await asyncio.shield(task)
+        self._cache[key] = (monotonic() + self.ttl, hosts)
+        return hosts
+
+    async def close(self):
+        await self._resolver.close()
+
+
+class ConnectorPool:
+    def __init__(self):
+        self._connectors: dict[str | None, aiohttp.TCPConnector] = {}
+        self._ssl_context = None
+        self._resolver: CachingResolver | None = None
+
+    @property
+    def ssl_context(self):
+        if self._ssl_context is None:
+            self._ssl_context = TLSv1_3_BYPASS.create_ssl_context()
+        return self._ssl_context
+
+    @property
+    def resolver(self) -> CachingResolver:
+        if self._resolver is None:
+            self._resolver = CachingResolver(ttl=float(getattr(settings, "DNS_CACHE_TTL", 300)))
+        return self._resolver
+
+    def get(self, proxy: str | None) -> aiohttp.TCPConnector:
+        connector = self._connectors.get(proxy)
+        if connector is not None and not connector.closed:
+            return connector
+
+        connector_kwargs = {
+            "ssl": self.ssl_context,
+            "resolver": self.resolver,
+            "limit": int(getattr(settings, "CONNECTOR_LIMIT", 0)),
+            "limit_per_host": int(getattr(settings, "CONNECTOR_LIMIT_PER_HOST", 0)),
+            "use_dns_cache": False,
+        }
+        if proxy:
+            connector = ProxyConnector.from_url(url=proxy, rdns=True, **connector_kwargs)
+        else:
+            connector = aiohttp.TCPConnector(**connector_kwargs)
+        self._connectors[proxy] = connector
+        return connector
+
+    async def close(self):
+        connectors, self._connectors = self._connectors, {}
+        for connector in connectors.values():
+            await connector.close()
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+
+
+connector_pool = ConnectorPool()
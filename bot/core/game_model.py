@@ -0,0 +1,380 @@
+import base64
+import hashlib
+import json
+import random
+from datetime import datetime, timezone
+from time import time
+from typing import Callable
+from urllib.parse import quote
+
+from bot.utils.boosts import FreeBoostType, UpgradableBoostType
+from bot.utils.graphql import OperationName
+
+ENERGY_PER_LIMIT_LEVEL = 1000
+TAPBOT_PRICE = 200_000
+TAPBOT_DURATION = 3 * 60 * 60
+TAPBOT_ATTEMPTS = 3
+VERIFICATION_DELAY = 10
+
+
+def fake_query_id(user_id: int, auth_date: int = 1_700_000_000) -> str:
+    user = json.dumps(
+        {
+            "id": user_id,
+            "first_name": "Sim",
+            "last_name": str(user_id),
+            "username": f"sim{user_id}",
+        },
+        separators=(",", ":"),
+    )
+    return (
+        f"query_id=AAH{user_id:010d}&user={quote(user)}"
+        f"&auth_date={auth_date}&hash={user_id:064x}"
+    )
+
+
+def fake_access_token(user_id: int, expires_at: float) -> str:
+    def encode(value: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+
+    header = encode({"alg": "none", "typ": "JWT"})
+    return f"{header}.{encode({'sub': user_id, 'exp': int(expires_at)})}."
+
+
+def isoformat(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(timespec="milliseconds")
+
+
+class GameError(Exception):
+    pass
+
+
+class SimulatedAccount:
+    __slots__ = (
+        "user_id",
+        "coins",
+        "energy",
+        "energy_updated_at",
+        "weapon_level",
+        "energy_limit_level",
+        "recharge_level",
+        "boss_level",
+        "boss_health",
+        "nonce",
+        "turbo_amount",
+        "turbo_until",
+        "refill_amount",
+        "spins",
+        "tapbot_purchased",
+        "tapbot_ends_at",
+        "tapbot_attempts",
+        "tasks",
+    )
+
+    def __init__(self, user_id: int, now: float, nonce: str):
+        self.user_id = user_id
+        self.coins = 0
+        self.energy = ENERGY_PER_LIMIT_LEVEL
+        self.energy_updated_at = now
+        self.weapon_level = 1
+        self.energy_limit_level = 1
+        self.recharge_level = 1
+        self.boss_level = 1
+        self.boss_health = GameModel.boss_max_health(1)
+        self.nonce = nonce
+        self.turbo_amount = 3
+        self.turbo_until = 0.0
+        self.refill_amount = 6
+        self.spins = 10
+        self.tapbot_purchased = False
+        self.tapbot_ends_at: float | None = None
+        self.tapbot_attempts = 0
+        self.tasks: dict[str, list] = {}
+
+    @property
+    def max_energy(self) -> int:
+        return self.energy_limit_level * ENERGY_PER_LIMIT_LEVEL
+
+    def energy_at(self, now: float) -> int:
+        regenerated = (now - self.energy_updated_at) * self.recharge_level
+        return int(min(self.max_energy, self.energy + regenerated))
+
+    def set_energy(self, energy: int, now: float):
+        self.energy = energy
+        self.energy_updated_at = now
+
+
+class GameModel:
+    """In-memory MemeFi game answering the GraphQL operations the bot sends.
+
+    Energy regenerates at ``energyRechargeLevel`` per second up to ``1000 * energyLimitLevel``.
+    Each tap batch must carry the nonce returned by the previous response. Taps cost
+    ``weaponLevel`` energy each and deal the same damage to the boss. All randomness comes
+    from ``seed`` and ``clock`` is injectable, so runs are reproducible.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        clock: Callable[[], float] = time,
+        campaigns: int = 2,
+        tasks_per_campaign: int = 3,
+        token_ttl: float = 3600,
+    ):
+        self.random = random.Random(seed)
+        self.clock = clock
+        self.token_ttl = token_ttl
+        self.operations = 0
+        self.accounts: dict[int, SimulatedAccount] = {}
+        self.tokens: dict[str, int] = {}
+        self.campaigns = {
+            f"campaign-{campaign}": [
+                f"task-{campaign}-{task}" for task in range(tasks_per_campaign)
+            ]
+            for campaign in range(campaigns)
+        }
+        self.handlers: dict[str, Callable[[SimulatedAccount, dict, float], dict]] = {
+            OperationName.QUERY_GAME_CONFIG: self.game_config,
+            OperationName.MutationGameProcessTapsBatch: self.process_taps,
+            OperationName.telegramGameSetNextBoss: self.set_next_boss,
+            OperationName.telegramGameActivateBooster: self.activate_booster,
+            OperationName.telegramGamePurchaseUpgrade: self.purchase_upgrade,
+            OperationName.SlotMachineSpin: self.spin,
+            OperationName.TapbotConfig: self.tapbot_config,
+            OperationName.TapbotStart: self.tapbot_start,
+            OperationName.TapbotClaim: self.tapbot_claim,
+            OperationName.CampaignLists: self.campaign_lists,
+            OperationName.GetTasksList: self.tasks_list,
+            OperationName.GetTaskById: self.task_by_id,
+            OperationName.CampaignTaskToVerification: self.move_to_verification,
+            OperationName.CampaignTaskMarkAsCompleted: self.mark_completed,
+            OperationName.QueryVideoAdTask: lambda *_: {"videoAdTask": None},
+            OperationName.getSocialTask: lambda *_: {"socialTask": None},
+            OperationName.TwitterProfile: lambda *_: {"twitterProfile": None},
+        }
+
+    @staticmethod
+    def boss_max_health(level: int) -> int:
+        return 1000 * 2 ** (level - 1)
+
+    @staticmethod
+    def upgrade_price(level: int) -> int:
+        return 1000 * 2 ** (level - 1)
+
+    def new_nonce(self, previous: str = "") -> str:
+        return hashlib.sha256(f"{previous}{self.random.random()}".encode()).hexdigest()
+
+    def execute(self, operation_name: str, variables: dict | None, token: str | None) -> dict:
+        """Answer one GraphQL operation with a ``{"data": ...}`` or ``{"errors": ...}`` item."""
+        now = self.clock()
+        self.operations += 1
+        try:
+            if operation_name == OperationName.MutationTelegramUserLogin:
+                data = self.login(variables or {}, now)
+            else:
+                handler = self.handlers.get(operation_name)
+                if handler is None:
+                    raise GameError(f"Unknown operation {operation_name}")
+                account = self.authenticate(token)
+                data = handler(account, variables or {}, now)
+        except GameError as error:
+            return {"errors": [{"message": str(error)}]}
+        return {"data": data}
+
+    def authenticate(self, token: str | None) -> SimulatedAccount:
+        user_id = self.tokens.get(token)
+        if user_id is None:
+            raise GameError("Unauthorized")
+        return self.accounts[user_id]
+
+    def login(self, variables: dict, now: float) -> dict:
+        user_id = variables.get("webAppData", {}).get("user", {}).get("id")
+        if user_id is None:
+            raise GameError("Invalid init data")
+        if user_id not in self.accounts:
+            self.accounts[user_id] = SimulatedAccount(user_id, now, self.new_nonce())
+        token = fake_access_token(user_id, now + self.token_ttl)
+        self.tokens[token] = user_id
+        return {"telegramUserLogin": {"access_token": token}}
+
+    def profile(self, account: SimulatedAccount, now: float) -> dict:
+        return {
+            "coinsAmount": account.coins,
+            "currentEnergy": account.energy_at(now),
+            "maxEnergy": account.max_energy,
+            "weaponLevel": account.weapon_level,
+            "energyLimitLevel": account.energy_limit_level,
+            "energyRechargeLevel": account.recharge_level,
+            "tapBotLevel": int(account.tapbot_purchased),
+            "currentBoss": {
+                "level": account.boss_level,
+                "currentHealth": account.boss_health,
+                "maxHealth": self.boss_max_health(account.boss_level),
+            },
+            "freeBoosts": {
+                "currentTurboAmount": account.turbo_amount,
+                "currentRefillEnergyAmount": account.refill_amount,
+            },
+            "nonce": account.nonce,
+            "spinEnergyTotal": account.spins,
+        }
+
+    def game_config(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        return {"telegramGameGetConfig": self.profile(account, now)}
+
+    def process_taps(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        payload = variables.get("payload", {})
+        if payload.get("nonce") != account.nonce:
+            raise GameError("Invalid nonce")
+        taps = int(payload.get("tapsCount", 0))
+        if taps <= 0 or len(payload.get("vector", "").split(",")) != taps:
+            raise GameError("Invalid taps vector")
+
+        energy = account.energy_at(now)
+        if now >= account.turbo_until:
+            taps = min(taps, energy // account.weapon_level)
+            energy -= taps * account.weapon_level
+        damage = min(taps * account.weapon_level, account.boss_health)
+        account.set_energy(energy, now)
+        account.boss_health -= damage
+        account.coins += damage
+        account.nonce = self.new_nonce(account.nonce)
+        return {"telegramGameProcessTapsBatch": self.profile(account, now)}
+
+    def set_next_boss(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        if account.boss_health > 0:
+            raise GameError("Current boss is still alive")
+        account.boss_level += 1
+        account.boss_health = self.boss_max_health(account.boss_level)
+        return {"telegramGameSetNextBoss": self.profile(account, now)}
+
+    def activate_booster(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        booster_type = variables.get("boosterType")
+        if booster_type == FreeBoostType.TURBO and account.turbo_amount > 0:
+            account.turbo_amount -= 1
+            account.turbo_until = now + 10
+        elif booster_type == FreeBoostType.ENERGY and account.refill_amount > 0:
+            account.refill_amount -= 1
+            account.set_energy(account.max_energy, now)
+        else:
+            raise GameError(f"Booster {booster_type} is not available")
+        return {"telegramGameActivateBooster": self.profile(account, now)}
+
+    def purchase_upgrade(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        upgrade_type = variables.get("upgradeType")
+        if upgrade_type == UpgradableBoostType.TAPBOT:
+            if account.tapbot_purchased:
+                raise GameError("TapBot is already purchased")
+            price = TAPBOT_PRICE
+        else:
+            attribute = {
+                UpgradableBoostType.TAP: "weapon_level",
+                UpgradableBoostType.ENERGY: "energy_limit_level",
+                UpgradableBoostType.CHARGE: "recharge_level",
+            }.get(upgrade_type)
+            if attribute is None:
+                raise GameError(f"Unknown upgrade {upgrade_type}")
+            price = self.upgrade_price(getattr(account, attribute) + 1)
+
+        if account.coins < price:
+            raise GameError("Not enough coins")
+        account.set_energy(account.energy_at(now), now)
+        account.coins -= price
+        if upgrade_type == UpgradableBoostType.TAPBOT:
+            account.tapbot_purchased = True
+        else:
+            setattr(account, attribute, getattr(account, attribute) + 1)
+        return {"telegramGamePurchaseUpgrade": self.profile(account, now)}
+
+    def spin(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        spins = int(variables.get("payload", {}).get("spinsCount", 1))
+        if spins <= 0 or spins > account.spins:
+            raise GameError("Not enough spins")
+        account.spins -= spins
+        reward = self.random.choice((0, 100, 500, 1000)) * spins
+        account.coins += reward
+        return {
+            "slotMachineSpinV2": {
+                "spinResults": [{"rewardAmount": reward, "rewardType": "COINS"}],
+                "gameConfig": self.profile(account, now),
+            }
+        }
+
+    def tapbot(self, account: SimulatedAccount) -> dict:
+        return {
+            "isPurchased": account.tapbot_purchased,
+            "endsAt": isoformat(account.tapbot_ends_at) if account.tapbot_ends_at else None,
+            "usedAttempts": account.tapbot_attempts,
+            "totalAttempts": TAPBOT_ATTEMPTS,
+            "damagePerSec": account.weapon_level,
+        }
+
+    def tapbot_config(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        return {"telegramGameTapbotGetConfig": self.tapbot(account)}
+
+    def tapbot_start(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        if not account.tapbot_purchased or account.tapbot_ends_at:
+            raise GameError("TapBot can not be started")
+        if account.tapbot_attempts >= TAPBOT_ATTEMPTS:
+            raise GameError("TapBot attempts are spent")
+        account.tapbot_attempts += 1
+        account.tapbot_ends_at = now + TAPBOT_DURATION
+        return {"telegramGameTapbotStart": self.tapbot(account)}
+
+    def tapbot_claim(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        if not account.tapbot_ends_at or account.tapbot_ends_at > now:
+            raise GameError("TapBot is not finished")
+        account.coins += account.weapon_level * TAPBOT_DURATION
+        account.tapbot_ends_at = None
+        return {"telegramGameTapbotClaimCoins": self.tapbot(account)}
+
+    def campaign_lists(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        return {
+            "campaignLists": {
+                "special": [],
+                "normal": [
+                    {"id": campaign_id, "name": campaign_id} for campaign_id in self.campaigns
+                ],
+            }
+        }
+
+    def task_state(self, account: SimulatedAccount, task_id: str) -> list:
+        return account.tasks.setdefault(task_id, [None, 0.0])
+
+    def task(self, account: SimulatedAccount, task_id: str) -> dict:
+        status, available_at = self.task_state(account, task_id)
+        return {
+            "id": task_id,
+            "name": task_id,
+            "status": status,
+            "userTaskId": f"{account.user_id}:{task_id}",
+            "verificationAvailableAt": isoformat(available_at) if available_at else None,
+        }
+
+    def tasks_list(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        task_ids = self.campaigns.get(variables.get("campaignId"))
+        if task_ids is None:
+            raise GameError("Campaign not found")
+        return {"campaignTasks": [self.task(account, task_id) for task_id in task_ids]}
+
+    def task_by_id(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        return {"campaignTaskGetConfig": self.task(account, variables.get("taskId"))}
+
+    def move_to_verification(
+        self, account: SimulatedAccount, variables: dict, now: float
+    ) -> dict:
+        task_id = variables.get("taskConfigId")
+        state = self.task_state(account, task_id)
+        if state[0] is None:
+            state[0] = "Verification"
+            state[1] = now + VERIFICATION_DELAY
+        return {"campaignTaskMoveToVerificationV2": self.task(account, task_id)}
+
+    def mark_completed(self, account: SimulatedAccount, variables: dict, now: float) -> dict:
+        task_id = variables.get("userTaskId", "").split(":", 1)[-1]
+        state = self.task_state(account, task_id)
+        if state[0] != "Verification" or state[1] > now:
+            raise GameError("Task is not ready for completion")
+        state[0] = "Completed"
+        account.coins += 1000
+        return {"campaignTaskMarkAsCompleted": self.task(account, task_id)}
@@ -0,0 +1,98 @@
+import asyncio
+from time import time
+from typing import Awaitable, Callable
+
+from bot.config import settings
+
+
+class EnergyModel:
+    @staticmethod
+    def recharge_rate(profile_data: dict) -> float:
+        recharge_level = max(profile_data.get("energyRechargeLevel", 1), 1)
+        return recharge_level * float(getattr(settings, "ENERGY_RECHARGE_PER_LEVEL", 1))
+
+    @staticmethod
+    def max_energy(profile_data: dict) -> int:
+        if profile_data.get("maxEnergy"):
+            return profile_data["maxEnergy"]
+        limit_level = max(profile_data.get("energyLimitLevel", 1), 1)
+        return limit_level * int(getattr(settings, "ENERGY_LIMIT_PER_LEVEL", 1000))
+
+    @staticmethod
+    def tap_cost(profile_data: dict, taps: int) -> int:
+        return taps * profile_data.get("weaponLevel", 0)
+
+    @staticmethod
+    def affordable_taps(profile_data: dict, energy: int, min_taps: int, max_taps: int) -> int:
+        weapon_level = profile_data.get("weaponLevel", 0)
+        if weapon_level <= 0:
+            return max_taps
+        return max(min_taps, min(max_taps, energy // weapon_level))
+
+    @classmethod
+    def refill_target(cls, profile_data: dict, max_taps: int) -> int:
+        return min(cls.tap_cost(profile_data, max_taps), cls.max_energy(profile_data))
+
+    @classmethod
+    def energy_at(cls, profile_data: dict, elapsed: float) -> int:
+        current_energy = profile_data.get("currentEnergy", 0)
+        max_energy = max(cls.max_energy(profile_data), current_energy)
+        return int(min(max_energy, current_energy + cls.recharge_rate(profile_data) * elapsed))
+
+    @classmethod
+    def seconds_until(cls, profile_data: dict, elapsed: float, need_energy: int) -> float:
+        need_energy = min(need_energy, cls.max_energy(profile_data))
+        missing_energy = need_energy - cls.energy_at(profile_data, elapsed)
+        if missing_energy <= 0:
+            return 0
+        return missing_energy / cls.recharge_rate(profile_data)
+
+
+class ProfileState:
+    def __init__(self, fetch: Callable[[], Awaitable[dict]]):
+        self.data: dict = {}
+        self.updated_at = 0
+        self.stale = True
+        self._fetch = fetch
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def age(self) -> float:
+        return time() - self.updated_at
+
+    @property
+    def energy(self) -> int:
+        return EnergyModel.energy_at(self.data, self.age)
+
+    def seconds_until_energy(self, need_energy: int) -> float:
+        return EnergyModel.seconds_until(self.data, self.age, need_energy)
+
+    def update(self, profile_data: dict | None) -> bool:
+        if not profile_data or "coinsAmount" not in profile_data:
+            return False
+        self.data = profile_data
+        self.updated_at = time()
+        self.stale = False
+        return True
+
+    def invalidate(self):
+        self.stale = True
+
+    async def get(self, max_age: float | None = None) -> dict:
+        if self.data and not self.stale and (max_age is None or self.age < max_age):
+            return self.data
+        return await self.refresh()
+
+    async def refresh(self) -> dict:
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return await asyncio.shield(self._refresh_task)
+
+    async def _refresh(self) -> dict:
+        try:
+            profile_data = await self._fetch()
+            if not self.update(profile_data):
+                return profile_data
+            return self.data
+        finally:
+            self._refresh_task = None
@@ -0,0 +1,162 @@
+import asyncio
+from functools import lru_cache
+from http import HTTPStatus
+from time import perf_counter
+
+import aiohttp
+
+from bot.config import settings
+from bot.core.metrics import (
+    account_operations,
+    graphql_http_requests,
+    graphql_latency,
+    graphql_operations,
+    proxy_label,
+)
+from bot.core.rate_limiter import is_rate_limit_message, rate_limiter
+from bot.core.retry import get_breaker, retry_budget
+from bot.core.transport import Transport
+from bot.exceptions import ExpiredTokenException, InvalidProtocol
+from bot.utils.json_codec import dumps
+
+
+class OperationTemplate:
+    """Request body with the constant operation name and query serialized once."""
+
+    __slots__ = ("operation_name", "prefix", "suffix", "empty_body")
+
+    def __init__(self, operation_name: str, query: str):
+        self.operation_name = operation_name
+        self.prefix = b'{"operationName":' + dumps(operation_name) + b',"variables":'
+        self.suffix = b',"query":' + dumps(query) + b"}"
+        self.empty_body = self.prefix + b"{}" + self.suffix
+
+    def render(self, variables: dict | bytes | None = None) -> bytes:
+        if not variables:
+            return self.empty_body
+        if isinstance(variables, bytes):
+            return self.prefix + variables + self.suffix
+        return self.prefix + dumps(variables) + self.suffix
+
+
+@lru_cache(maxsize=None)
+def get_template(operation_name: str, query: str) -> OperationTemplate:
+    return OperationTemplate(operation_name, query)
+
+
+class GraphQLClient:
+    def __init__(
+        self, transport: Transport, proxy: str | None = None, account: int | None = None
+    ):
+        self.transport = transport
+        self.proxy = proxy
+        self.proxy_label = proxy_label(proxy)
+        self.account = account
+        self.breaker = get_breaker(transport.endpoint, self.proxy_label)
+        self.max_batch_size = int(getattr(settings, "GRAPHQL_MAX_BATCH_SIZE", 10))
+        self._pending: list[tuple[str, bytes, asyncio.Future]] = []
+        self._flush_scheduled = False
+        self._send_tasks: set[asyncio.Task] = set()
+
+    async def execute(
+        self, operation_name: str, query: str, variables: dict | bytes | None = None
+    ):
+        """Queue an operation for the current tick's batch and return its ``data``.
+
+        ``variables`` may be passed already serialized, as JSON bytes.
+        """
+        started_at = perf_counter()
+        probe = await self.breaker.acquire()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        body = get_template(operation_name, query).render(variables)
+        self._pending.append((operation_name, body, future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        status = "ok"
+        try:
+            return await future
+        except BaseException as error:
+            status = type(error).__name__
+            raise
+        finally:
+            if probe:
+                self.breaker.release_probe()
+            graphql_operations.inc(operation_name, self.proxy_label, status)
+            graphql_latency.observe(
+                operation_name, self.proxy_label, value=perf_counter() - started_at
+            )
+            account_operations.inc(self.account)
+
+    @staticmethod
+    def is_endpoint_failure(error: Exception) -> bool:
+        """Gateway 5xx responses and timeouts; connection errors may be the proxy's alone."""
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status >= HTTPStatus.INTERNAL_SERVER_ERROR
+        return isinstance(error, asyncio.TimeoutError)
+
+    @staticmethod
+    def retry_after(error: aiohttp.ClientResponseError) -> float | None:
+        try:
+            return float(error.headers.get("Retry-After")) if error.headers else None
+        except (TypeError, ValueError):
+            return None
+
+    def _flush(self):
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, []
+        for idx in range(0, len(pending), self.max_batch_size):
+            task = asyncio.create_task(self._send(pending[idx : idx + self.max_batch_size]))
+            self._send_tasks.add(task)
+            task.add_done_callback(self._send_tasks.discard)
+
+    async def _send(self, batch: list[tuple[str, bytes, asyncio.Future]]):
+        if len(batch) > 1:
+            body = b"[" + b",".join(operation_body for _, operation_body, _ in batch) + b"]"
+        else:
+            body = batch[0][1]
+        try:
+            await rate_limiter.acquire(self.proxy)
+            graphql_http_requests.inc(self.proxy_label)
+            response_json = await self.transport.post(
+                body, tuple(operation_name for operation_name, _, _ in batch)
+            )
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as error:
+            if self.is_endpoint_failure(error):
+                self.breaker.record_failure()
+            if (
+                isinstance(error, aiohttp.ClientResponseError)
+                and error.status == HTTPStatus.TOO_MANY_REQUESTS
+            ):
+                rate_limiter.record_limited(self.proxy, self.retry_after(error))
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        self.breaker.record_success()
+        retry_budget.deposit()
+        rate_limiter.record_success(self.proxy)
+        results = response_json if isinstance(response_json, list) else [response_json]
+        for idx, (operation_name, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            if idx >= len(results):
+                future.set_exception(InvalidProtocol(f"{operation_name} msg: missing batch result"))
+                continue
+            result = results[idx]
+            if "errors" in result:
+                message = result["errors"][0]["message"]
+                if is_rate_limit_message(message):
+                    rate_limiter.record_limited(self.proxy)
+                exception_class = (
+                    ExpiredTokenException if "unauthorized" in message.lower() else InvalidProtocol
+                )
+                future.set_exception(exception_class(f"{operation_name} msg: {message}"))
+                continue
+            future.set_result(result.get("data") or {})
@@ -0,0 +1,63 @@
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import unquote
+
+from bot.utils.json_codec import dumps
+
+
+@dataclass(frozen=True, slots=True)
+class TelegramInitData:
+    """Fields of a session's init data, with the login mutation variables rendered once."""
+
+    query_id: str
+    user_id: int
+    username: str | None
+    auth_date: int
+    hash: str
+    login_variables: bytes
+
+    @classmethod
+    def parse(cls, session_query_id: str) -> "TelegramInitData":
+        init_data = session_query_id
+        if "tgWebAppData" in init_data:
+            init_data = unquote(
+                string=init_data.split("tgWebAppData=", maxsplit=1)[1].split(
+                    "&tgWebAppVersion", maxsplit=1
+                )[0]
+            )
+        tg_web_data = unquote(init_data)
+
+        query_id = tg_web_data.split("query_id=", maxsplit=1)[1].split("&user", maxsplit=1)[0]
+        user_data = tg_web_data.split("user=", maxsplit=1)[1].split("&auth_date", maxsplit=1)[0]
+        auth_date = tg_web_data.split("auth_date=", maxsplit=1)[1].split("&hash", maxsplit=1)[0]
+        hash_ = tg_web_data.split("hash=", maxsplit=1)[1]
+        user_obj = json.loads(user_data)
+        web_app_data = {
+            "auth_date": int(auth_date),
+            "hash": hash_,
+            "query_id": query_id,
+            "checkDataString": f"auth_date={auth_date}\nquery_id={query_id}\nuser={user_data}",
+            "user": {
+                "id": user_obj.get("id"),
+                "allows_write_to_pm": True,
+                "first_name": user_obj.get("first_name"),
+                "last_name": user_obj.get("last_name"),
+                "username": user_obj.get("username"),
+                "language_code": "en",
+            },
+        }
+
+        return cls(
+            query_id=query_id,
+            user_id=user_obj.get("id"),
+            username=user_obj.get("username"),
+            auth_date=int(auth_date),
+            hash=hash_,
+            login_variables=dumps({"webAppData": web_app_data}),
+        )
+
+
+@lru_cache(maxsize=None)
+def parse_init_data(session_query_id: str) -> TelegramInitData:
+    return TelegramInitData.parse(session_query_id)
@@ -0,0 +1,202 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+from bot.config import settings
+from bot.utils import logger
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def proxy_label(proxy: str | None) -> str:
+    """Proxy host and port without credentials, or ``direct``."""
+    if not proxy:
+        return "direct"
+    parts = urlsplit(proxy)
+    return f"{parts.hostname}:{parts.port}" if parts.port else str(parts.hostname)
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    @abstractmethod
+    def samples(self) -> list[str]: ...
+
+    def render(self) -> str:
+        return "\n".join(
+            [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+            + self.samples()
+        )
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = {}
+
+    def observe(self, *labels, value: float):
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+            self._sums[labels] = 0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {self._sums[labels]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        self.port_offset = 0
+        self._runner: web.AppRunner | None = None
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self):
+        port = int(getattr(settings, "METRICS_PORT", 0))
+        if port <= 0 or self._runner is not None:
+            return
+        port += self.port_offset
+        host = getattr(settings, "METRICS_HOST", "127.0.0.1")
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"Serving metrics on <lc>http://{host}:{port}/metrics</lc>")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+registry = MetricsRegistry()
+
+graphql_operations = registry.register(
+    Counter(
+        "memefi_graphql_operations_total",
+        "GraphQL operations by outcome.",
+        ("operation", "proxy", "status"),
+    )
+)
+graphql_latency = registry.register(
+    Histogram(
+        "memefi_graphql_operation_seconds",
+        "Time from queuing a GraphQL operation to receiving its result.",
+        ("operation", "proxy"),
+    )
+)
+graphql_http_requests = registry.register(
+    Counter(
+        "memefi_graphql_http_requests_total",
+        "HTTP requests sent to the gateway, each carrying one batch.",
+        ("proxy",),
+    )
+)
+graphql_retries = registry.register(
+    Counter("memefi_graphql_retries_total", "Retried GraphQL operations.", ("operation",))
+)
+account_operations = registry.register(
+    Counter(
+        "memefi_account_operations_total", "GraphQL operations sent per account.", ("account",)
+    )
+)
+taps_sent = registry.register(
+    Counter("memefi_taps_total", "Taps accepted by the game.", ("account",))
+)
+coins_gained = registry.register(
+    Counter("memefi_coins_gained_total", "Coins gained from taps.", ("account",))
+)
+energy = registry.register(
+    Gauge("memefi_energy", "Energy after the last tap batch.", ("account",))
+)
+error_sleeps = registry.register(
+    Counter(
+        "memefi_error_sleeps_total",
+        "Sleeps taken after an error in the run loop.",
+        ("account", "error"),
+    )
+)
+error_sleep_seconds = registry.register(
+    Counter(
+        "memefi_error_sleep_seconds_total",
+        "Seconds slept after errors in the run loop.",
+        ("error",),
+    )
+)
+logins = registry.register(
+    Counter("memefi_logins_total", "Login attempts by outcome.", ("account", "result"))
+)
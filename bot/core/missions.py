@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+from itertools import count
+from time import time
+
+from bot.config import settings
+from bot.core.retry import RetryPolicy, mission_backoff
+from bot.core.scheduler import scheduler
+from bot.core.session_store import SessionStore, session_store
+from helpers import check_complete_task_delay
+
+
+class TTLCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._data: dict = {}
+
+    def get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if time() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time() + self.ttl, value)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+
+class MissionIndex:
+    """Completed quests, failing quests and finished or inactive campaigns per account.
+
+    Kept under the ``missions`` key of session state, read once per account and then
+    served from memory. A quest that fails to verify or complete is left alone for a
+    backoff that grows with each consecutive failure.
+    """
+
+    def __init__(
+        self, store: SessionStore, backoff: RetryPolicy, recheck_interval: int = 86400
+    ):
+        self.store = store
+        self.backoff = backoff
+        self.recheck_interval = recheck_interval
+        self.sessions: dict[int, dict] = {}
+
+    def get_session(self, user_id: int) -> dict:
+        session = self.sessions.get(user_id)
+        if session is None:
+            session = self.store.get_state(user_id).get("missions") or {}
+            session.setdefault("completed_tasks", [])
+            session.setdefault("done_campaigns", {})
+            session.setdefault("inactive_campaigns", {})
+            session.setdefault("failed_tasks", {})
+            self.sessions[user_id] = session
+        return session
+
+    def save(self, user_id: int):
+        self.store.update_state(user_id, missions=self.get_session(user_id))
+
+    def is_task_completed(self, user_id: int, task_id: str) -> bool:
+        return task_id in self.get_session(user_id)["completed_tasks"]
+
+    def mark_task_completed(self, user_id: int, task_id: str):
+        session = self.get_session(user_id)
+        if task_id not in session["completed_tasks"]:
+            session["completed_tasks"].append(task_id)
+            session["failed_tasks"].pop(task_id, None)
+            self.save(user_id)
+
+    def is_task_backed_off(self, user_id: int, task_id: str) -> bool:
+        failure = self.get_session(user_id)["failed_tasks"].get(task_id)
+        return bool(failure) and time() < failure[1]
+
+    def mark_task_failed(self, user_id: int, task_id: str):
+        failed_tasks = self.get_session(user_id)["failed_tasks"]
+        failures = failed_tasks.get(task_id, [0, 0])[0]
+        failed_tasks[task_id] = [failures + 1, time() + self.backoff.delay(failures)]
+        self.save(user_id)
+
+    def clear_task_failure(self, user_id: int, task_id: str):
+        if self.get_session(user_id)["failed_tasks"].pop(task_id, None) is not None:
+            self.save(user_id)
+
+    def is_campaign_skipped(self, user_id: int, campaign_id: str) -> bool:
+        session = self.get_session(user_id)
+        marked_at = session["done_campaigns"].get(campaign_id) or session[
+            "inactive_campaigns"
+        ].get(campaign_id)
+        return bool(marked_at) and time() - marked_at < self.recheck_interval
+
+    def mark_campaign_done(self, user_id: int, campaign_id: str):
+        self.get_session(user_id)["done_campaigns"][campaign_id] = time()
+        self.save(user_id)
+
+    def mark_campaign_inactive(self, user_id: int, campaign_id: str):
+        self.get_session(user_id)["inactive_campaigns"][campaign_id] = time()
+        self.save(user_id)
+
+
+mission_index = MissionIndex(store=session_store, backoff=mission_backoff)
+
+
+class MissionScheduler:
+    VERIFY_INTERVAL = 4
+
+    def __init__(self, tapper):
+        self.tapper = tapper
+        self.cache = TTLCache(ttl=int(getattr(settings, "MISSION_CACHE_TTL", 1800)))
+        self._queue: list[tuple[float, int, str, str, str, dict]] = []
+        self._scheduled: set[str] = set()
+        self._counter = count()
+        self._next_verify_at = 0
+        self._wakeup = asyncio.Event()
+        self._worker: asyncio.Task | None = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __contains__(self, task_id: str):
+        return task_id in self._scheduled
+
+    async def get_campaigns(self) -> list[dict]:
+        campaigns = self.cache.get("campaigns")
+        if campaigns is None:
+            campaign_lists = await self.tapper.get_campaign_list()
+            campaigns = campaign_lists.get("special", []) + campaign_lists.get("normal", [])
+            if campaign_lists:
+                self.cache.set("campaigns", campaigns)
+        return campaigns
+
+    async def get_task_list(self, campaign_id: str) -> list[dict]:
+        task_list = self.cache.get(campaign_id)
+        if task_list is None:
+            task_list = await self.tapper.get_campaign_task_list(campaign_id=campaign_id)
+            if task_list:
+                self.cache.set(campaign_id, task_list)
+        return task_list
+
+    async def discover(self):
+        user_id = self.tapper.init_data.user_id
+        campaign_ids = [
+            campaign.get("id")
+            for campaign in await self.get_campaigns()
+            if not mission_index.is_campaign_skipped(user_id, campaign.get("id"))
+        ]
+        task_lists = await asyncio.gather(
+            *(self.get_task_list(campaign_id) for campaign_id in campaign_ids)
+        )
+        for campaign_id, task_list in zip(campaign_ids, task_lists):
+            tasks = []
+            for task in task_list:
+                task_id = task.get("id")
+                if task.get("status") == "Completed":
+                    mission_index.mark_task_completed(user_id, task_id)
+                elif not mission_index.is_task_completed(user_id, task_id):
+                    tasks.append(task)
+
+            if task_list and not tasks:
+                mission_index.mark_campaign_done(user_id, campaign_id)
+                continue
+
+            tasks = [
+                task
+                for task in tasks
+                if task.get("id") not in self
+                and not mission_index.is_task_backed_off(user_id, task.get("id"))
+            ]
+            task_details = await asyncio.gather(
+                *(self.tapper.get_task_by_id(task_id=task.get("id")) for task in tasks)
+            )
+            for task, task_detail in zip(tasks, task_details):
+                if task_detail:
+                    self.schedule_task(campaign_id, task, task_detail)
+
+    def schedule_task(self, campaign_id: str, task: dict, task_detail: dict):
+        task_id = task.get("id")
+        if task_id in self._scheduled:
+            return
+
+        if task.get("status") == "Verification":
+            complete_delay_sec = check_complete_task_delay(
+                task_detail.get("verificationAvailableAt")
+            )
+            due_at = time() + max(complete_delay_sec, 1)
+            self._push(due_at, "complete", campaign_id, task_id, task_detail)
+        else:
+            due_at = max(time(), self._next_verify_at)
+            self._next_verify_at = due_at + self.VERIFY_INTERVAL
+            self._push(due_at, "verify", campaign_id, task_id, task_detail)
+
+    def _push(
+        self, due_at: float, action: str, campaign_id: str, task_id: str, task_detail: dict
+    ):
+        heapq.heappush(
+            self._queue,
+            (due_at, next(self._counter), action, campaign_id, task_id, task_detail),
+        )
+        self._scheduled.add(task_id)
+        self._wakeup.set()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        self._queue.clear()
+        self._scheduled.clear()
+        self._next_verify_at = 0
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._queue:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._queue[0][0] - time()
+            if delay > 0:
+                timer = scheduler.wheel.call_later(delay, self._wakeup.set)
+                try:
+                    await self._wakeup.wait()
+                finally:
+                    timer.cancel()
+                continue
+
+            _, _, action, campaign_id, task_id, task_detail = heapq.heappop(self._queue)
+            succeeded = False
+            try:
+                async with scheduler.worker():
+                    succeeded = await self._process(action, campaign_id, task_id, task_detail)
+            except Exception as error:
+                self.tapper.error(f"Unknown error while processing quest: {error}")
+            finally:
+                self._scheduled.discard(task_id)
+
+            user_id = self.tapper.init_data.user_id
+            if succeeded:
+                mission_index.clear_task_failure(user_id, task_id)
+                self.cache.invalidate(campaign_id)
+            else:
+                mission_index.mark_task_failed(user_id, task_id)
+
+    async def _process(
+        self, action: str, campaign_id: str, task_id: str, task_detail: dict
+    ) -> bool:
+        task_name = task_detail.get("name")
+        if action == "complete":
+            task_completed = await self.tapper.complete_task(
+                user_task_id=task_detail.get("userTaskId")
+            )
+            if task_completed:
+                mission_index.mark_task_completed(self.tapper.init_data.user_id, task_id)
+                self.tapper.success(f"Successfully completed <lc>{task_name}</lc> quest")
+            return bool(task_completed)
+
+        verification_detail = await self.tapper.verify_task(
+            task_config_id=task_detail.get("id"), campaign_id=campaign_id
+        )
+        if verification_detail:
+            self.tapper.success(f"Successfully started <lc>{task_name}</lc> quest")
+        return bool(verification_detail)
@@ -0,0 +1,249 @@
+import asyncio
+import contextvars
+import cProfile
+import heapq
+import io
+import os
+import pstats
+from collections import defaultdict
+from contextlib import contextmanager, suppress
+from itertools import count
+from time import perf_counter, thread_time
+from typing import Awaitable
+
+from bot.config import settings
+from bot.utils import logger
+
+try:
+    import yappi
+except ImportError:
+    yappi = None
+
+ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+current_phase: contextvars.ContextVar[tuple[str, float] | None] = contextvars.ContextVar(
+    "current_phase", default=None
+)
+
+
+def describe_callback(handle: asyncio.Handle) -> str:
+    """The task behind ``handle`` and the innermost ``await`` outside asyncio it stopped at."""
+    task = getattr(handle._callback, "__self__", None)
+    if not isinstance(task, asyncio.Task):
+        return repr(handle)[:300]
+    coro = task.get_coro()
+    frame = None
+    while coro is not None and getattr(coro, "cr_frame", None) is not None:
+        if not coro.cr_frame.f_code.co_filename.startswith(ASYNCIO_DIR):
+            frame = coro.cr_frame
+        coro = coro.cr_await
+    location = f" until {frame.f_code.co_filename}:{frame.f_lineno}" if frame else ""
+    return f"{task.get_name()} {task.get_coro().__qualname__}{location}"
+
+
+class PhaseStats:
+    __slots__ = ("calls", "wall", "cpu")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+class Profiler:
+    """Profiles the run loop per function, per Tapper phase and per slow event-loop callback.
+
+    Phase wall time accrues between ``enter`` calls and stops while the account sleeps.
+    Phase CPU time is measured around every event-loop callback and charged to the phase
+    of the task that ran it, split at ``enter`` calls made inside the callback, so
+    concurrent accounts do not blur into each other.
+    """
+
+    def __init__(self, slow_callback_duration: float, output_dir: str):
+        self.enabled = False
+        self.slow_callback_duration = slow_callback_duration
+        self.output_dir = output_dir
+        self.phases: dict[str, PhaseStats] = defaultdict(PhaseStats)
+        self.slow_callbacks: list[tuple[float, int, str, str]] = []
+        self.slow_callback_count = 0
+        self.cycles = 0
+        self.max_cycles = 0
+        self._counter = count()
+        self._limit_reached: asyncio.Event | None = None
+        self._original_run = None
+        self._step_cpu: float | None = None
+        self._function_profiler: cProfile.Profile | None = None
+
+    def _switch(self, value: tuple[str, float] | None):
+        if self._step_cpu is not None:
+            now = thread_time()
+            previous = current_phase.get()
+            self.phases[previous[0] if previous else "other"].cpu += now - self._step_cpu
+            self._step_cpu = now
+        current_phase.set(value)
+
+    def enter(self, phase: str | None):
+        if not self.enabled:
+            return
+        now = perf_counter()
+        previous = current_phase.get()
+        if previous is not None:
+            self.phases[previous[0]].wall += now - previous[1]
+        if phase:
+            self.phases[phase].calls += 1
+        self._switch((phase, now) if phase else None)
+
+    @contextmanager
+    def idle(self):
+        if not self.enabled:
+            yield
+            return
+        previous = current_phase.get()
+        self.enter(None)
+        try:
+            yield
+        finally:
+            if previous is not None and self.enabled:
+                self._switch((previous[0], perf_counter()))
+
+    def cycle(self):
+        if not self.enabled:
+            return
+        self.enter(None)
+        self.cycles += 1
+        if self.max_cycles and self.cycles >= self.max_cycles and self._limit_reached:
+            self._limit_reached.set()
+
+    def _instrument_callbacks(self):
+        profiler = self
+        original_run = self._original_run = asyncio.events.Handle._run
+
+        def _run(handle):
+            context = handle._context
+            started_phase = context.get(current_phase) if context is not None else None
+            started_at = perf_counter()
+            profiler._step_cpu = thread_time()
+            try:
+                original_run(handle)
+            finally:
+                ended_phase = context.get(current_phase) if context is not None else None
+                profiler.phases[ended_phase[0] if ended_phase else "other"].cpu += (
+                    thread_time() - profiler._step_cpu
+                )
+                profiler._step_cpu = None
+            phase_name = (started_phase or ended_phase or ("other",))[0]
+            if ended_phase and ended_phase[0] != phase_name:
+                phase_name = f"{phase_name}>{ended_phase[0]}"
+            duration = perf_counter() - started_at
+            if duration >= profiler.slow_callback_duration:
+                profiler.record_slow_callback(duration, handle, phase_name)
+
+        asyncio.events.Handle._run = _run
+
+    def record_slow_callback(self, duration: float, handle: asyncio.Handle, phase: str):
+        self.slow_callback_count += 1
+        entry = (duration, next(self._counter), phase, describe_callback(handle))
+        if len(self.slow_callbacks) < 100:
+            heapq.heappush(self.slow_callbacks, entry)
+        else:
+            heapq.heappushpop(self.slow_callbacks, entry)
+
+    def start(self):
+        self.enabled = True
+        self._limit_reached = asyncio.Event()
+        self._instrument_callbacks()
+        if yappi is not None:
+            yappi.set_clock_type("cpu")
+            yappi.start()
+        else:
+            self._function_profiler = cProfile.Profile()
+            self._function_profiler.enable()
+
+    def stop(self):
+        if yappi is not None:
+            yappi.stop()
+        elif self._function_profiler is not None:
+            self._function_profiler.disable()
+        if self._original_run is not None:
+            asyncio.events.Handle._run = self._original_run
+            self._original_run = None
+        self.enabled = False
+
+    async def run(self, coro: Awaitable, seconds: float, cycles: int):
+        """Run ``coro`` under the profiler until it ends, ``seconds`` pass or ``cycles`` complete."""
+        self.max_cycles = cycles
+        self.start()
+        task = asyncio.ensure_future(coro)
+        limit = asyncio.ensure_future(self._limit_reached.wait())
+        started_at = perf_counter()
+        try:
+            await asyncio.wait(
+                {task, limit},
+                timeout=seconds if seconds > 0 else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            elapsed = perf_counter() - started_at
+            for future in (task, limit):
+                future.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+            self.stop()
+            self.write_reports(elapsed)
+
+    def format_phases(self, elapsed: float) -> str:
+        lines = [
+            f"Profiled {elapsed:.1f}s wall, {self.cycles} run loop cycles",
+            f"{'phase':<12} {'calls':>9} {'wall s':>10} {'wall ms/call':>13} {'cpu s':>9} {'cpu %':>7}",
+        ]
+        total_cpu = sum(stats.cpu for stats in self.phases.values()) or 1
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].cpu):
+            per_call = stats.wall / stats.calls * 1000 if stats.calls else 0
+            lines.append(
+                f"{name:<12} {stats.calls:>9,} {stats.wall:>10.1f} {per_call:>13.1f} "
+                f"{stats.cpu:>9.2f} {stats.cpu / total_cpu * 100:>6.1f}%"
+            )
+        return "\n".join(lines)
+
+    def format_slow_callbacks(self) -> str:
+        lines = [
+            f"{self.slow_callback_count} callbacks took longer than "
+            f"{self.slow_callback_duration * 1000:.0f}ms (slowest {len(self.slow_callbacks)} shown)"
+        ]
+        for duration, _, phase, handle in sorted(self.slow_callbacks, reverse=True):
+            lines.append(f"{duration * 1000:>9.1f}ms  {phase:<12} {handle}")
+        return "\n".join(lines)
+
+    def format_functions(self) -> str:
+        output = io.StringIO()
+        if yappi is not None:
+            yappi.get_func_stats().sort("ttot").print_all(out=output)
+        elif self._function_profiler is not None:
+            stats = pstats.Stats(self._function_profiler, stream=output)
+            stats.sort_stats("cumulative").print_stats(60)
+            stats.sort_stats("tottime").print_stats(60)
+        return output.getvalue()
+
+    def write_reports(self, elapsed: float):
+        os.makedirs(self.output_dir, exist_ok=True)
+        phases = self.format_phases(elapsed)
+        reports = {
+            "phases.txt": phases,
+            "slow_callbacks.txt": self.format_slow_callbacks(),
+            "functions.txt": self.format_functions(),
+        }
+        for file_name, report in reports.items():
+            with open(os.path.join(self.output_dir, file_name), "w", encoding="utf-8") as file:
+                file.write(report + "\n")
+        for line in phases.splitlines():
+            logger.info(line)
+        logger.info(
+            f"Profile reports written to <lc>{self.output_dir}</lc> | "
+            f"Slow callbacks: <ly>{self.slow_callback_count}</ly>"
+        )
+
+
+profiler = Profiler(
+    slow_callback_duration=float(getattr(settings, "SLOW_CALLBACK_THRESHOLD", 0.1)),
+    output_dir=getattr(settings, "PROFILE_DIR", "profile"),
+)
@@ -0,0 +1,73 @@
+from time import time
+
+from bot.config import settings
+from bot.core.retry import RetryPolicy, error_backoff
+from bot.core.session_store import SessionStore, session_store
+
+
+class SessionQuarantine:
+    """Tracks login failures per account and backs off sessions that keep failing.
+
+    The first failures are retried on the regular error backoff. From ``threshold``
+    consecutive failures on, the session counts as dead and is quarantined on a much
+    longer exponential backoff, so a stale query id costs a handful of requests a day.
+    State lives in the session store and survives restarts.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        threshold: int,
+        retry_policy: RetryPolicy,
+        quarantine_policy: RetryPolicy,
+    ):
+        self.store = store
+        self.threshold = threshold
+        self.retry_policy = retry_policy
+        self.quarantine_policy = quarantine_policy
+
+    def state(self, user_id: int) -> dict:
+        return self.store.get_state(user_id).get("login", {})
+
+    def remaining(self, user_id: int) -> float:
+        return max(self.state(user_id).get("until", 0) - time(), 0)
+
+    def is_dead(self, user_id: int) -> bool:
+        return self.state(user_id).get("failures", 0) >= self.threshold
+
+    def record_failure(self, user_id: int, reason: str, auth_date: int) -> float:
+        failures = self.state(user_id).get("failures", 0) + 1
+        if failures >= self.threshold:
+            delay = self.quarantine_policy.delay(failures - self.threshold)
+        else:
+            delay = self.retry_policy.delay(failures - 1)
+        self.store.update_state(
+            user_id,
+            login={
+                "failures": failures,
+                "until": time() + delay,
+                "reason": reason,
+                "auth_date": auth_date,
+            },
+        )
+        return delay
+
+    def record_success(self, user_id: int):
+        if self.state(user_id):
+            self.store.update_state(user_id, login={})
+
+
+def session_age_days(auth_date: int) -> float:
+    return (time() - auth_date) / 86400
+
+
+quarantine = SessionQuarantine(
+    store=session_store,
+    threshold=int(getattr(settings, "QUARANTINE_THRESHOLD", 3)),
+    retry_policy=error_backoff,
+    quarantine_policy=RetryPolicy(
+        attempts=0,
+        base_delay=float(getattr(settings, "QUARANTINE_BASE_DELAY", 1800)),
+        max_delay=float(getattr(settings, "QUARANTINE_MAX_DELAY", 86400)),
+    ),
+)
@@ -0,0 +1,144 @@
+import asyncio
+from time import monotonic
+
+from bot.config import settings
+from bot.utils import logger
+
+
+class TokenBucket:
+    """Reservation-based token bucket whose rate adapts to rate-limit responses.
+
+    ``acquire`` reserves the next token up front, so concurrent callers queue in arrival
+    order with a single sleep each. The rate grows additively on success and halves on a
+    rate-limit response, at most once per ``cooldown`` seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: float,
+        min_rate: float,
+        increase: float,
+        cooldown: float = 1,
+    ):
+        self.name = name
+        self.rate = rate
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst
+        self.increase = increase
+        self.cooldown = cooldown
+        self.tokens = burst
+        self._updated_at = monotonic()
+        self._decreased_at = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.tokens + (now - self._updated_at) * self.rate, self.burst)
+        self._updated_at = now
+
+    async def acquire(self):
+        now = monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+    def record_success(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.rate + self.increase, self.max_rate)
+
+    def record_limited(self, retry_after: float | None = None):
+        now = monotonic()
+        if now - self._decreased_at < self.cooldown:
+            return
+        self._decreased_at = now
+        self._refill(now)
+        self.rate = max(self.rate / 2, self.min_rate)
+        if retry_after:
+            self.tokens = min(self.tokens, -retry_after * self.rate)
+        logger.warning(
+            f"Rate limited on <lc>{self.name}</lc> | "
+            f"Lowering request rate to <ly>{self.rate:.1f}</ly>/s"
+        )
+
+
+class RateLimiter:
+    """Global request ceiling plus one adaptive bucket per proxy, shared by every account.
+
+    Direct connections only count against the global ceiling. Buckets live in one
+    process: ``split`` divides the global ceiling between shard processes, while the
+    per-proxy rate applies to each process that uses the proxy.
+    """
+
+    def __init__(
+        self, global_rate: float, per_proxy_rate: float, min_rate: float, increase: float
+    ):
+        self.per_proxy_rate = per_proxy_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.global_bucket = (
+            TokenBucket(
+                name="all proxies",
+                rate=global_rate,
+                burst=global_rate,
+                min_rate=min_rate,
+                increase=increase,
+            )
+            if global_rate > 0
+            else None
+        )
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def split(self, shards: int):
+        """Keep this process's share of the global ceiling when running ``shards`` of them."""
+        bucket = self.global_bucket
+        if bucket is None or shards <= 1:
+            return
+        bucket.rate = bucket.max_rate = bucket.max_rate / shards
+        bucket.min_rate = min(bucket.min_rate, bucket.rate)
+        bucket.burst = bucket.tokens = max(bucket.burst / shards, 1)
+
+    def bucket(self, proxy: str | None) -> TokenBucket | None:
+        if self.per_proxy_rate <= 0 or not proxy:
+            return self.global_bucket
+        bucket = self._buckets.get(proxy)
+        if bucket is None:
+            bucket = self._buckets[proxy] = TokenBucket(
+                name=proxy,
+                rate=self.per_proxy_rate,
+                burst=self.per_proxy_rate,
+                min_rate=self.min_rate,
+                increase=self.increase,
+            )
+        return bucket
+
+    async def acquire(self, proxy: str | None):
+        if self.global_bucket is not None:
+            await self.global_bucket.acquire()
+        bucket = self.bucket(proxy)
+        if bucket is not None and bucket is not self.global_bucket:
+            await bucket.acquire()
+
+    def record_success(self, proxy: str | None):
+        bucket = self.bucket(proxy)
+        if bucket is not None:
+            bucket.record_success()
+
+    def record_limited(self, proxy: str | None, retry_after: float | None = None):
+        bucket = self.bucket(proxy)
+        if bucket is not None:
+            bucket.record_limited(retry_after)
+
+
+def is_rate_limit_message(message: str) -> bool:
+    message = message.lower()
+    return "too many requests" in message or "rate limit" in message
+
+
+rate_limiter = RateLimiter(
+    global_rate=float(getattr(settings, "RATE_LIMIT_GLOBAL", 50)),
+    per_proxy_rate=float(getattr(settings, "RATE_LIMIT_PER_PROXY", 5)),
+    min_rate=float(getattr(settings, "RATE_LIMIT_MIN", 0.5)),
+    increase=float(getattr(settings, "RATE_LIMIT_INCREASE", 0.01)),
+)
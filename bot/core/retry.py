@@ -0,0 +1,199 @@
+import asyncio
+import random
+from time import monotonic
+from typing import Awaitable, Callable
+
+from bot.config import settings
+from bot.utils import logger
+
+
+class RetryBudget:
+    """Process-wide allowance of retries, earned by successful requests.
+
+    Every success deposits ``ratio`` tokens and every retry withdraws one, so retries
+    stay a bounded fraction of real traffic during an outage instead of multiplying it.
+    A small reserve refills over time so a quiet process can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 5, max_tokens: float = 100):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._reserve = min_per_second
+        self._updated_at = monotonic()
+
+    def _refill(self):
+        now = monotonic()
+        self._reserve = min(
+            self._reserve + (now - self._updated_at) * self.min_per_second, self.min_per_second
+        )
+        self._updated_at = now
+
+    def deposit(self):
+        self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self._refill()
+        if self._reserve >= 1:
+            self._reserve -= 1
+            return True
+        return False
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, gated by a shared retry budget.
+
+    Delays are drawn from the upper half of the backoff window, so accounts that failed
+    together spread out instead of retrying in lockstep.
+    """
+
+    def __init__(
+        self,
+        attempts: int,
+        base_delay: float,
+        max_delay: float,
+        budget: RetryBudget | None = None,
+    ):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+
+    def delay(self, attempt: int) -> float:
+        window = min(self.base_delay * 2**attempt, self.max_delay)
+        return random.uniform(window / 2, window)
+
+    async def backoff(
+        self, attempt: int, sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ) -> bool:
+        """Sleep before retry number ``attempt + 1``, or return False when out of retries."""
+        if attempt + 1 >= self.attempts:
+            return False
+        if self.budget is not None and not self.budget.withdraw():
+            return False
+        await sleep(self.delay(attempt))
+        return True
+
+
+class CircuitBreaker:
+    """Stops every account from calling an endpoint that keeps failing.
+
+    After ``failure_threshold`` consecutive transport failures the circuit opens and
+    callers wait in :meth:`acquire`. Once ``reset_timeout`` passes a single caller is let
+    through as a probe; its success closes the circuit for everyone, its failure reopens
+    it with a doubled timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self, name: str, failure_threshold: int, reset_timeout: float, max_reset_timeout: float
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._open_until = 0.0
+        self._changed: asyncio.Event | None = None
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def acquire(self) -> bool:
+        """Wait until a request may be sent. Returns True when the caller is the probe."""
+        while self.state != self.CLOSED:
+            now = monotonic()
+            if self.state == self.OPEN and now >= self._open_until:
+                self.state = self.HALF_OPEN
+                return True
+
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            timeout = self._open_until - now if self.state == self.OPEN else None
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return False
+
+    def release_probe(self):
+        """Let the next caller probe if the current probe ended without a result."""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self._open_until = monotonic()
+            self._notify()
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != self.CLOSED:
+            logger.info(f"GraphQL endpoint <lc>{self.name}</lc> recovered, resuming requests")
+            self.state = self.CLOSED
+            self.opened = 0
+            self._notify()
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self.failures >= self.failure_threshold
+        ):
+            timeout = min(self.reset_timeout * 2**self.opened, self.max_reset_timeout)
+            self.opened += 1
+            self.state = self.OPEN
+            self._open_until = monotonic() + timeout
+            logger.warning(
+                f"GraphQL endpoint <lc>{self.name}</lc> is failing | "
+                f"Pausing all requests for <ly>{timeout:.0f}</ly>s"
+            )
+            self._notify()
+
+
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+
+
+def get_breaker(endpoint: str, route: str = "direct") -> CircuitBreaker:
+    """Breaker for ``endpoint`` as reached through ``route``, so one dead proxy trips alone."""
+    breaker = _breakers.get((endpoint, route))
+    if breaker is None:
+        breaker = _breakers[(endpoint, route)] = CircuitBreaker(
+            name=f"{endpoint} via {route}",
+            failure_threshold=int(getattr(settings, "CIRCUIT_FAILURE_THRESHOLD", 10)),
+            reset_timeout=float(getattr(settings, "CIRCUIT_RESET_TIMEOUT", 30)),
+            max_reset_timeout=float(getattr(settings, "CIRCUIT_MAX_RESET_TIMEOUT", 600)),
+        )
+    return breaker
+
+
+retry_budget = RetryBudget(
+    ratio=float(getattr(settings, "RETRY_BUDGET_RATIO", 0.2)),
+    min_per_second=float(getattr(settings, "RETRY_BUDGET_MIN_PER_SECOND", 5)),
+)
+
+request_retry = RetryPolicy(
+    attempts=int(getattr(settings, "RETRY_ATTEMPTS", 5)),
+    base_delay=float(getattr(settings, "RETRY_BASE_DELAY", 1)),
+    max_delay=float(getattr(settings, "RETRY_MAX_DELAY", 30)),
+    budget=retry_budget,
+)
+
+error_backoff = RetryPolicy(
+    attempts=0,
+    base_delay=float(getattr(settings, "ERROR_BACKOFF_BASE", 15)),
+    max_delay=float(getattr(settings, "ERROR_BACKOFF_MAX", 900)),
+)
+
+mission_backoff = RetryPolicy(
+    attempts=0,
+    base_delay=float(getattr(settings, "MISSION_RETRY_BASE", 600)),
+    max_delay=float(getattr(settings, "MISSION_RETRY_MAX", 86400)),
+)
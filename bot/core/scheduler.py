@@ -0,0 +1,184 @@
+import asyncio
+from contextlib import asynccontextmanager
+from math import ceil
+from time import monotonic
+from typing import Callable
+
+from bot.config import settings
+from bot.utils import logger
+
+
+class TimerHandle:
+    __slots__ = ("callback", "rounds", "cancelled")
+
+    def __init__(self, callback: Callable[[], None], rounds: int):
+        self.callback = callback
+        self.rounds = rounds
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Hashed timer wheel driving every account wake-up from a single loop timer."""
+
+    def __init__(self, tick: float = 0.1, slots: int = 512):
+        self.tick = tick
+        self.slots = slots
+        self._wheel: list[list[TimerHandle]] = [[] for _ in range(slots)]
+        self._current_tick = 0
+        self._pending = 0
+        self._started_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return self._pending
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> TimerHandle:
+        if self._task is None or self._task.done():
+            self._started_at = monotonic() - self._current_tick * self.tick
+            self._task = asyncio.create_task(self._run())
+
+        elapsed_ticks = (monotonic() - self._started_at) / self.tick - self._current_tick
+        ticks = max(ceil(delay / self.tick + elapsed_ticks), 1)
+        handle = TimerHandle(callback, rounds=(ticks - 1) // self.slots)
+        self._wheel[(self._current_tick + ticks) % self.slots].append(handle)
+        self._pending += 1
+        return handle
+
+    async def sleep(self, delay: float):
+        future = asyncio.get_running_loop().create_future()
+        handle = self.call_later(delay, lambda: future.done() or future.set_result(None))
+        try:
+            await future
+        finally:
+            handle.cancel()
+
+    async def _run(self):
+        while self._pending:
+            next_tick_at = self._started_at + (self._current_tick + 1) * self.tick
+            await asyncio.sleep(max(next_tick_at - monotonic(), 0))
+            self._current_tick += 1
+
+            slot = self._current_tick % self.slots
+            due, waiting = [], []
+            for handle in self._wheel[slot]:
+                if handle.cancelled:
+                    self._pending -= 1
+                elif handle.rounds:
+                    handle.rounds -= 1
+                    waiting.append(handle)
+                else:
+                    self._pending -= 1
+                    due.append(handle)
+            self._wheel[slot] = waiting
+
+            for handle in due:
+                handle.callback()
+
+
+class AccountScheduler:
+    """Owns account wake-ups and caps how many accounts run a step at the same time."""
+
+    def __init__(self, max_active: int, tick: float):
+        self.wheel = TimerWheel(tick=tick)
+        self.max_active = max_active
+        self._slots: asyncio.Semaphore | None = None
+        self._holders: set[asyncio.Task] = set()
+
+    @property
+    def active(self) -> int:
+        return len(self._holders)
+
+    @property
+    def slots(self) -> asyncio.Semaphore | None:
+        if self._slots is None and self.max_active > 0:
+            self._slots = asyncio.Semaphore(self.max_active)
+        return self._slots
+
+    async def acquire(self):
+        if self.slots is not None:
+            await self.slots.acquire()
+        self._holders.add(asyncio.current_task())
+
+    def release(self):
+        task = asyncio.current_task()
+        if task not in self._holders:
+            return
+        self._holders.discard(task)
+        if self.slots is not None:
+            self.slots.release()
+
+    @asynccontextmanager
+    async def worker(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def sleep(self, delay: float):
+        holding = asyncio.current_task() in self._holders
+        if holding:
+            self.release()
+        try:
+            await self.wheel.sleep(delay)
+        finally:
+            if holding:
+                await self.acquire()
+
+
+scheduler = AccountScheduler(
+    max_active=int(getattr(settings, "MAX_ACTIVE_ACCOUNTS", 200)),
+    tick=float(getattr(settings, "SCHEDULER_TICK", 0.1)),
+)
+
+
+class StartupRamp:
+    def __init__(self, accounts_per_second: float, max_logins: int):
+        self.accounts_per_second = accounts_per_second
+        self.max_logins = max_logins
+        self.total = 0
+        self.started = 0
+        self.ready = 0
+        self._logins: asyncio.Semaphore | None = None
+        self._last_report_at = 0.0
+
+    @property
+    def logins(self) -> asyncio.Semaphore | None:
+        if self._logins is None and self.max_logins > 0:
+            self._logins = asyncio.Semaphore(self.max_logins)
+        return self._logins
+
+    async def ramp(self, items: list):
+        self.total = len(items)
+        interval = 1 / self.accounts_per_second if self.accounts_per_second > 0 else 0
+        for item in items:
+            yield item
+            self.started += 1
+            if interval and self.started < self.total:
+                await asyncio.sleep(interval)
+
+    @asynccontextmanager
+    async def login(self):
+        if self.logins is None:
+            yield
+            return
+        async with self.logins:
+            yield
+
+    def mark_ready(self):
+        self.ready += 1
+        if self.ready == self.total or monotonic() - self._last_report_at >= 10:
+            self._last_report_at = monotonic()
+            logger.info(
+                f"Startup progress: <lc>{self.ready}</lc>/<lc>{self.total}</lc> accounts ready | "
+                f"<lc>{self.started}</lc> started"
+            )
+
+
+startup_ramp = StartupRamp(
+    accounts_per_second=float(getattr(settings, "STARTUP_ACCOUNTS_PER_SECOND", 10)),
+    max_logins=int(getattr(settings, "STARTUP_MAX_LOGINS", 20)),
+)
@@ -0,0 +1,271 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from time import time
+
+from bot.config import settings
+from bot.core.init_data import parse_init_data
+from bot.utils import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    query_id TEXT PRIMARY KEY,
+    user_id INTEGER,
+    session_name TEXT,
+    user_agent TEXT,
+    state TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_session_name ON sessions (session_name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SessionStore:
+    def __init__(self, file_name: str = "sessions.db"):
+        self.file_name = file_name
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._pending_user_agents: dict[int, str] = {}
+        self._pending_states: dict[int, str] = {}
+        self._writing_states: dict[int, str] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_future: asyncio.Future | None = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self.file_name, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            self.upgrade_schema(self._db)
+        return self._db
+
+    @staticmethod
+    def upgrade_schema(db: sqlite3.Connection):
+        # Databases created before sessions were keyed by Telegram user id lack the column.
+        columns = {row[1] for row in db.execute("PRAGMA table_info(sessions)")}
+        with db:
+            if "user_id" not in columns:
+                db.execute("ALTER TABLE sessions ADD COLUMN user_id INTEGER")
+                db.executemany(
+                    "UPDATE sessions SET user_id = ? WHERE query_id = ?",
+                    [
+                        (parse_init_data(query_id).user_id, query_id)
+                        for (query_id,) in db.execute("SELECT query_id FROM sessions").fetchall()
+                    ],
+                )
+            indexes = {row[1]: row[2] for row in db.execute("PRAGMA index_list(sessions)")}
+            if not indexes.get("sessions_user_id"):
+                # Refreshed query ids used to add a second row for the same user. Keep the
+                # newest one, with any user agent an older row recorded.
+                db.execute(
+                    "UPDATE sessions SET user_agent = ("
+                    "SELECT older.user_agent FROM sessions AS older "
+                    "WHERE older.user_id = sessions.user_id AND older.user_agent IS NOT NULL "
+                    "ORDER BY older.rowid DESC LIMIT 1"
+                    ") WHERE user_agent IS NULL"
+                )
+                db.execute(
+                    "DELETE FROM sessions WHERE rowid NOT IN "
+                    "(SELECT MAX(rowid) FROM sessions GROUP BY user_id)"
+                )
+                db.execute("DROP INDEX IF EXISTS sessions_user_id")
+                db.execute("CREATE UNIQUE INDEX sessions_user_id ON sessions (user_id)")
+
+    def migrate(self, query_ids: list[str]):
+        """Sync sessions with the query ids file, one row per Telegram user.
+
+        A refreshed query id replaces the stored one and clears the session's login state.
+        Accounts no longer in the file are removed.
+        """
+        sessions: dict[int, tuple[str, str | None]] = {}
+        for query_id in query_ids:
+            init_data = parse_init_data(query_id)
+            sessions[init_data.user_id] = (query_id, init_data.username)
+        with self._lock, self.db:
+            known = dict(self.db.execute("SELECT user_id, query_id FROM sessions"))
+            now = time()
+            new_sessions = [
+                (query_id, user_id, session_name, now, now)
+                for user_id, (query_id, session_name) in sessions.items()
+                if user_id not in known
+            ]
+            refreshed_sessions = [
+                (query_id, session_name, now, user_id)
+                for user_id, (query_id, session_name) in sessions.items()
+                if user_id in known and known[user_id] != query_id
+            ]
+            removed_sessions = [(user_id,) for user_id in known if user_id not in sessions]
+            self.db.executemany(
+                "INSERT INTO sessions (query_id, user_id, session_name, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                new_sessions,
+            )
+            self.db.executemany(
+                "UPDATE sessions SET query_id = ?, session_name = ?, "
+                "state = json_remove(state, '$.login'), updated_at = ? WHERE user_id = ?",
+                refreshed_sessions,
+            )
+            self.db.executemany("DELETE FROM sessions WHERE user_id = ?", removed_sessions)
+
+            if not self.db.execute("SELECT 1 FROM meta WHERE key = 'user_agents_json'").fetchone():
+                self.db.executemany(
+                    "UPDATE sessions SET user_agent = ? "
+                    "WHERE session_name = ? AND user_agent IS NULL",
+                    [
+                        (session["user_agent"], session["session_name"])
+                        for session in self.read_user_agents_file()
+                    ],
+                )
+                self.db.execute(
+                    "INSERT INTO meta (key, value) VALUES ('user_agents_json', ?)", (now,)
+                )
+        if new_sessions:
+            logger.info(f"Imported <lc>{len(new_sessions)}</lc> new sessions into {self.file_name}")
+        if refreshed_sessions:
+            logger.info(f"Updated query ids of <lc>{len(refreshed_sessions)}</lc> sessions")
+        if removed_sessions:
+            logger.info(
+                f"Removed <lc>{len(removed_sessions)}</lc> sessions no longer in the query ids file"
+            )
+
+    @staticmethod
+    def read_user_agents_file() -> list[dict]:
+        try:
+            with open("user_agents.json", "r") as user_agents:
+                session_data = json.load(user_agents)
+                if isinstance(session_data, list):
+                    return session_data
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return []
+
+    def get_query_ids(self) -> list[str]:
+        with self._lock:
+            rows = self.db.execute("SELECT query_id FROM sessions ORDER BY rowid").fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, query_id: str):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM sessions WHERE query_id = ?", (query_id,))
+
+    def get_user_agents(self) -> dict[int, str]:
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT user_id, user_agent FROM sessions WHERE user_agent IS NOT NULL"
+            ).fetchall()
+        return dict(rows)
+
+    def set_user_agent(self, user_id: int, user_agent: str):
+        self._pending_user_agents[user_id] = user_agent
+        self.schedule_flush()
+
+    def get_state(self, user_id: int) -> dict:
+        for states in (self._pending_states, self._writing_states):
+            if user_id in states:
+                return json.loads(states[user_id])
+        with self._lock:
+            row = self.db.execute(
+                "SELECT state FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def update_state(self, user_id: int, **state):
+        new_state = self.get_state(user_id)
+        new_state.update(state)
+        self._pending_states[user_id] = json.dumps(new_state)
+        self.schedule_flush()
+
+    def schedule_flush(self, delay: float = 1):
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(delay, self.flush_in_background)
+
+    def flush_in_background(self):
+        self._flush_handle = None
+        if self._flush_future is not None and not self._flush_future.done():
+            self.schedule_flush()
+            return
+        user_agents, self._pending_user_agents = self._pending_user_agents, {}
+        self._writing_states, self._pending_states = self._pending_states, {}
+        self._flush_future = asyncio.get_running_loop().run_in_executor(
+            None, self.write, user_agents, self._writing_states
+        )
+        self._flush_future.add_done_callback(self._on_flushed)
+
+    def _on_flushed(self, future: asyncio.Future):
+        self._writing_states = {}
+        if not future.cancelled() and future.exception():
+            logger.error(f"Failed to save sessions: {future.exception()}")
+
+    def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        user_agents, self._pending_user_agents = self._pending_user_agents, {}
+        states, self._pending_states = self._pending_states, {}
+        self.write(user_agents, states)
+
+    def write(self, user_agents: dict[int, str], states: dict[int, str]):
+        if not user_agents and not states:
+            return
+        now = time()
+        with self._lock, self.db:
+            self.db.executemany(
+                "UPDATE sessions SET user_agent = ?, updated_at = ? WHERE user_id = ?",
+                [(user_agent, now, user_id) for user_id, user_agent in user_agents.items()],
+            )
+            self.db.executemany(
+                "UPDATE sessions SET state = ?, updated_at = ? WHERE user_id = ?",
+                [(state, now, user_id) for user_id, state in states.items()],
+            )
+
+    def reset_after_fork(self):
+        """Drop state inherited from the parent process without touching its connection."""
+        self._db = None
+        self._lock = threading.Lock()
+        self._pending_user_agents = {}
+        self._pending_states = {}
+        self._writing_states = {}
+        self._flush_handle = None
+        self._flush_future = None
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class UserAgentRegistry:
+    def __init__(self, store: SessionStore):
+        self.store = store
+        self._user_agents: dict[int, str] | None = None
+
+    def get(self, user_id: int) -> str | None:
+        if self._user_agents is None:
+            self._user_agents = self.store.get_user_agents()
+        return self._user_agents.get(user_id)
+
+    def set(self, user_id: int, user_agent: str):
+        if self._user_agents is None:
+            self._user_agents = self.store.get_user_agents()
+        self._user_agents[user_id] = user_agent
+        self.store.set_user_agent(user_id, user_agent)
+
+
+session_store = SessionStore(file_name=getattr(settings, "SESSION_DB_FILE", "sessions.db"))
+user_agents = UserAgentRegistry(session_store)
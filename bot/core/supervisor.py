@@ -0,0 +1,206 @@
+import asyncio
+import multiprocessing
+import os
+from contextlib import suppress
+from multiprocessing.connection import Connection, wait
+from multiprocessing.synchronize import Event
+from time import monotonic
+from typing import Awaitable, Callable
+
+from bot.config import settings
+from bot.core.metrics import registry
+from bot.core.rate_limiter import rate_limiter
+from bot.core.scheduler import scheduler, startup_ramp
+from bot.core.session_store import session_store
+from bot.core.tracing import tracer
+from bot.utils import logger
+
+Account = tuple[str, str | None]
+RunAccounts = Callable[[list[Account]], Awaitable[None]]
+
+
+async def report_status(conn: Connection, shard: int, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        conn.send(
+            {
+                "shard": shard,
+                "pid": os.getpid(),
+                "accounts": startup_ramp.total,
+                "started": startup_ramp.started,
+                "ready": startup_ramp.ready,
+                "active": scheduler.active,
+                "timers": len(scheduler.wheel),
+            }
+        )
+
+
+async def wait_for_stop(stop_event: Event, interval: float = 0.5):
+    while not stop_event.is_set():
+        await asyncio.sleep(interval)
+
+
+async def run_shard(
+    run_accounts: RunAccounts,
+    accounts: list[Account],
+    conn: Connection,
+    shard: int,
+    shards: int,
+    stop_event: Event,
+):
+    registry.port_offset = shard
+    rate_limiter.split(shards)
+    session_store.reset_after_fork()
+    tracer.file_name = f"{os.path.splitext(tracer.file_name)[0]}-{shard}.jsonl"
+    reporter = asyncio.create_task(
+        report_status(conn, shard, float(getattr(settings, "SHARD_STATUS_INTERVAL", 10)))
+    )
+    stopper = asyncio.create_task(wait_for_stop(stop_event))
+    fleet = asyncio.create_task(run_accounts(accounts))
+    try:
+        await asyncio.wait({fleet, stopper}, return_when=asyncio.FIRST_COMPLETED)
+        # Cancelling lets run_accounts save tokens, missions and traces on the way out.
+        fleet.cancel()
+        with suppress(asyncio.CancelledError):
+            await fleet
+    finally:
+        reporter.cancel()
+        stopper.cancel()
+
+
+def worker_main(
+    run_accounts: RunAccounts,
+    accounts: list[Account],
+    conn: Connection,
+    shard: int,
+    shards: int,
+    stop_event: Event,
+):
+    try:
+        asyncio.run(run_shard(run_accounts, accounts, conn, shard, shards, stop_event))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+class ShardSupervisor:
+    def __init__(self, run_accounts: RunAccounts, accounts: list[Account], workers: int):
+        self.run_accounts = run_accounts
+        self.shards = [accounts[idx::workers] for idx in range(workers)]
+        self.processes: list[multiprocessing.Process | None] = [None] * workers
+        self.connections: list[Connection | None] = [None] * workers
+        self.statuses: list[dict] = [{} for _ in range(workers)]
+        self.restarts = [0] * workers
+        self.restart_at = [0.0] * workers
+        self.max_restart_delay = float(getattr(settings, "SHARD_MAX_RESTART_DELAY", 300))
+        self.stop_timeout = float(getattr(settings, "SHARD_STOP_TIMEOUT", 30))
+        self.stop_event = multiprocessing.Event()
+
+    def start_worker(self, shard: int):
+        parent_conn, child_conn = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=worker_main,
+            args=(
+                self.run_accounts,
+                self.shards[shard],
+                child_conn,
+                shard,
+                len(self.shards),
+                self.stop_event,
+            ),
+            name=f"memefi-shard-{shard}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        self.processes[shard] = process
+        self.connections[shard] = parent_conn
+        logger.info(
+            f"Shard <lc>{shard}</lc> started | pid: <lc>{process.pid}</lc> | "
+            f"accounts: <lc>{len(self.shards[shard])}</lc>"
+        )
+
+    def stop(self):
+        self.stop_event.set()
+        deadline = monotonic() + self.stop_timeout
+        for process in self.processes:
+            if process is not None:
+                process.join(timeout=max(deadline - monotonic(), 0))
+        for shard, process in enumerate(self.processes):
+            if process is not None and process.is_alive():
+                logger.warning(
+                    f"Shard <lc>{shard}</lc> did not stop within "
+                    f"<ly>{self.stop_timeout:.0f}</ly>s | Terminating"
+                )
+                process.terminate()
+                process.join(timeout=5)
+
+    def receive_statuses(self, ready: list):
+        for shard, conn in enumerate(self.connections):
+            if conn is None or conn not in ready:
+                continue
+            try:
+                while conn.poll():
+                    self.statuses[shard] = conn.recv()
+            except (EOFError, OSError):
+                conn.close()
+                self.connections[shard] = None
+
+    def check_workers(self):
+        now = monotonic()
+        for shard, process in enumerate(self.processes):
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                if self.connections[shard] is not None:
+                    self.connections[shard].close()
+                    self.connections[shard] = None
+                if process.exitcode == 0:
+                    self.processes[shard] = None
+                    self.restart_at[shard] = float("inf")
+                    logger.info(f"Shard <lc>{shard}</lc> finished")
+                    continue
+                self.restarts[shard] += 1
+                delay = min(2 ** self.restarts[shard], self.max_restart_delay)
+                self.restart_at[shard] = now + delay
+                self.processes[shard] = None
+                self.statuses[shard] = {}
+                logger.warning(
+                    f"Shard <lc>{shard}</lc> exited with code <lr>{process.exitcode}</lr> | "
+                    f"Restarting in <ly>{delay:.0f}</ly>s"
+                )
+
+            if now >= self.restart_at[shard]:
+                self.start_worker(shard)
+
+    def log_summary(self):
+        alive = sum(1 for process in self.processes if process is not None and process.is_alive())
+        started = sum(status.get("started", 0) for status in self.statuses)
+        ready = sum(status.get("ready", 0) for status in self.statuses)
+        active = sum(status.get("active", 0) for status in self.statuses)
+        logger.info(
+            f"Shards alive: <lc>{alive}</lc>/<lc>{len(self.processes)}</lc> | "
+            f"Accounts started: <lc>{started}</lc> | Ready: <lc>{ready}</lc> | "
+            f"Active: <lc>{active}</lc> | Restarts: <lc>{sum(self.restarts)}</lc>"
+        )
+
+    async def run(self):
+        summary_interval = float(getattr(settings, "SHARD_STATUS_INTERVAL", 10))
+        summary_at = monotonic() + summary_interval
+        for shard in range(len(self.shards)):
+            self.start_worker(shard)
+        try:
+            while True:
+                connections = [conn for conn in self.connections if conn is not None]
+                ready = await asyncio.to_thread(wait, connections, 1) if connections else []
+                if not connections:
+                    await asyncio.sleep(1)
+                self.receive_statuses(ready)
+                self.check_workers()
+                if monotonic() >= summary_at:
+                    summary_at = monotonic() + summary_interval
+                    self.log_summary()
+        finally:
+            self.stop()
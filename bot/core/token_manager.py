@@ -0,0 +1,64 @@
+import base64
+import json
+from time import time
+
+from bot.config import settings
+from bot.core.session_store import SessionStore, session_store
+
+
+class TokenManager:
+    """Caches access tokens per account, persisted as the ``token`` key of session state.
+
+    Each account's token is read from the session store once and then served from
+    memory. Writes go through the store's batched flush, so shard processes sharing the
+    database only ever touch their own accounts' rows.
+    """
+
+    def __init__(self, store: SessionStore, ttl: int = 3000, margin: int = 60):
+        self.store = store
+        self.ttl = ttl
+        self.margin = margin
+        self.tokens: dict[int, dict | None] = {}
+
+    @property
+    def persist(self) -> bool:
+        return str(getattr(settings, "PERSIST_TOKENS", "true")).lower() == "true"
+
+    @staticmethod
+    def get_token_expiry(access_token: str) -> float | None:
+        try:
+            payload = access_token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+            return float(exp) if exp else None
+        except Exception:
+            return None
+
+    def get(self, user_id: int) -> str | None:
+        if user_id not in self.tokens:
+            self.tokens[user_id] = (
+                self.store.get_state(user_id).get("token") if self.persist else None
+            )
+        token = self.tokens[user_id]
+        if not token:
+            return None
+        if time() >= token["expires_at"] - self.margin:
+            self.invalidate(user_id)
+            return None
+        return token["access_token"]
+
+    def set(self, user_id: int, access_token: str):
+        expires_at = self.get_token_expiry(access_token) or time() + self.ttl
+        token = {"access_token": access_token, "expires_at": expires_at}
+        self.tokens[user_id] = token
+        if self.persist:
+            self.store.update_state(user_id, token=token)
+
+    def invalidate(self, user_id: int):
+        if self.tokens.get(user_id):
+            self.tokens[user_id] = None
+            if self.persist:
+                self.store.update_state(user_id, token=None)
+
+
+token_manager = TokenManager(store=session_store)
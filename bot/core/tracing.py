@@ -0,0 +1,149 @@
+import json
+import random
+from collections import defaultdict, deque
+from time import perf_counter, time
+
+import aiohttp
+
+from bot.config import settings
+from bot.core.metrics import proxy_label
+from bot.utils import logger
+
+PHASES = ("queued", "dns", "connect", "server", "body")
+
+
+class Span:
+    __slots__ = ("operation", "proxy", "started_at", "marks", "status", "error")
+
+    def __init__(self, operation: str, proxy: str):
+        self.operation = operation
+        self.proxy = proxy
+        self.started_at = time()
+        self.marks: dict[str, float] = {"start": perf_counter()}
+        self.status: int | None = None
+        self.error: str | None = None
+
+    def mark(self, name: str):
+        self.marks[name] = perf_counter()
+
+    def between(self, start: str, end: str) -> float:
+        if start in self.marks and end in self.marks:
+            return max(self.marks[end] - self.marks[start], 0)
+        return 0
+
+    @property
+    def phases(self) -> dict[str, float]:
+        dns = self.between("dns_start", "dns_end")
+        connected_at = max(
+            self.marks.get(name, 0) for name in ("start", "queued_end", "connect_end")
+        )
+        return {
+            "queued": self.between("queued_start", "queued_end"),
+            "dns": dns,
+            "connect": max(self.between("connect_start", "connect_end") - dns, 0),
+            "server": max(self.marks.get("response", connected_at) - connected_at, 0),
+            "body": self.between("response", "end"),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "time": self.started_at,
+            "operation": self.operation,
+            "proxy": self.proxy,
+            "status": self.status,
+            "error": self.error,
+            "total": self.between("start", "end"),
+            **self.phases,
+        }
+
+
+class RequestTracer:
+    """Samples gateway requests and keeps their per-phase timings in a ring buffer.
+
+    Phases come from aiohttp ``TraceConfig`` hooks: waiting for a pooled connection, DNS,
+    connecting (TCP, proxy handshake and TLS), waiting for response headers, and reading
+    plus decoding the body.
+    """
+
+    def __init__(self, sample_rate: float, buffer_size: int, file_name: str):
+        self.sample_rate = sample_rate
+        self.file_name = file_name
+        self.spans: deque[Span] = deque(maxlen=buffer_size)
+        self._trace_config: aiohttp.TraceConfig | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def start(self, operations: tuple[str, ...], proxy: str | None) -> Span | None:
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        return Span("+".join(operations), proxy_label(proxy))
+
+    def finish(self, span: Span, status: int | None = None, error: Exception | None = None):
+        span.mark("end")
+        span.status = status
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        self.spans.append(span)
+
+    def trace_configs(self) -> list[aiohttp.TraceConfig]:
+        if not self.enabled:
+            return []
+        if self._trace_config is None:
+            self._trace_config = self.create_trace_config()
+        return [self._trace_config]
+
+    @staticmethod
+    def create_trace_config() -> aiohttp.TraceConfig:
+        def marker(name: str):
+            async def on_event(session, trace_config_ctx, params):
+                span = trace_config_ctx.trace_request_ctx
+                if isinstance(span, Span):
+                    span.mark(name)
+
+            return on_event
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_queued_start.append(marker("queued_start"))
+        trace_config.on_connection_queued_end.append(marker("queued_end"))
+        trace_config.on_connection_create_start.append(marker("connect_start"))
+        trace_config.on_connection_create_end.append(marker("connect_end"))
+        trace_config.on_dns_resolvehost_start.append(marker("dns_start"))
+        trace_config.on_dns_resolvehost_end.append(marker("dns_end"))
+        trace_config.on_request_end.append(marker("response"))
+        return trace_config
+
+    def dump(self) -> int:
+        if not self.spans:
+            return 0
+        with open(self.file_name, "a", encoding="utf-8") as file:
+            for span in self.spans:
+                file.write(json.dumps(span.to_dict()) + "\n")
+        count = len(self.spans)
+        self.log_summary()
+        self.spans.clear()
+        return count
+
+    def log_summary(self):
+        totals: dict[str, list[float]] = defaultdict(lambda: [0.0] * (len(PHASES) + 1))
+        for span in self.spans:
+            phases = span.phases
+            row = totals[span.proxy]
+            for idx, phase in enumerate(PHASES):
+                row[idx] += phases[phase]
+            row[-1] += 1
+        for proxy, row in totals.items():
+            count = row[-1]
+            breakdown = " | ".join(
+                f"{phase}: <ly>{row[idx] / count * 1000:.0f}</ly>ms"
+                for idx, phase in enumerate(PHASES)
+            )
+            logger.info(f"Trace <lc>{proxy}</lc> ({count:.0f} requests) | {breakdown}")
+
+
+tracer = RequestTracer(
+    sample_rate=float(getattr(settings, "TRACE_SAMPLE", 0)),
+    buffer_size=int(getattr(settings, "TRACE_BUFFER_SIZE", 10_000)),
+    file_name=getattr(settings, "TRACE_FILE", "traces.jsonl"),
+)
@@ -0,0 +1,153 @@
+import asyncio
+from abc import ABC, abstractmethod
+from http import HTTPStatus
+from types import MappingProxyType
+from typing import Any, Callable
+
+from aiocfscrape import CloudflareScraper
+
+from bot.config import settings
+from bot.core.connections import connector_pool
+from bot.core.game_model import GameModel
+from bot.core.tracing import tracer
+from bot.exceptions import ExpiredTokenException
+from bot.utils.json_codec import loads
+
+GRAPHQL_URL = getattr(settings, "GRAPHQL_URL", "https://api-gw-tg.memefi.club/graphql")
+JSON_HEADERS = {"Content-Type": "application/json"}
+HEADERS = MappingProxyType(
+    {
+        "Accept": "application/json, text/plain, */*",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Connection": "keep-alive",
+        "Content-Type": "application/json",
+        "Origin": "https://tg-app.memefi.club",
+        "Sec-Fetch-Dest": "empty",
+        "Sec-Fetch-Mode": "cors",
+        "Sec-Fetch-Site": "same-site",
+        "Sec-Ch-Ua": '"Google Chrome";v="127", "Chromium";v="127", "Not.A/Brand";v="24"',
+        "Sec-Ch-Ua-Mobile": "?1",
+        "Sec-Ch-Ua-Platform": "Android",
+    }
+)
+
+
+class Transport(ABC):
+    """Carries serialized GraphQL bodies to the game and returns the decoded reply.
+
+    Implementations raise ``ExpiredTokenException`` for rejected credentials and
+    ``aiohttp.ClientResponseError`` for other HTTP-level failures, so retry, circuit
+    breaker and rate limiter logic behave the same whatever carries the request.
+    """
+
+    endpoint: str
+
+    @property
+    @abstractmethod
+    def closed(self) -> bool: ...
+
+    @abstractmethod
+    def set_access_token(self, access_token: str | None): ...
+
+    @abstractmethod
+    async def post(self, body: bytes, operations: tuple[str, ...] = ()) -> Any: ...
+
+    @abstractmethod
+    async def close(self): ...
+
+
+class HttpTransport(Transport):
+    def __init__(self, proxy: str | None, user_agent: str, url: str = GRAPHQL_URL):
+        self.endpoint = url
+        self.proxy = proxy
+        self.http_client = CloudflareScraper(
+            headers=HEADERS,
+            connector=connector_pool.get(proxy),
+            connector_owner=False,
+            trace_configs=tracer.trace_configs(),
+        )
+        self.http_client.headers["User-Agent"] = user_agent
+
+    @property
+    def closed(self) -> bool:
+        return self.http_client.closed
+
+    def set_access_token(self, access_token: str | None):
+        if access_token:
+            self.http_client.headers["Authorization"] = f"Bearer {access_token}"
+        else:
+            self.http_client.headers.pop("Authorization", None)
+
+    async def post(self, body: bytes, operations: tuple[str, ...] = ()) -> Any:
+        span = tracer.start(operations, self.proxy)
+        status = None
+        try:
+            async with self.http_client.post(
+                url=self.endpoint, data=body, headers=JSON_HEADERS, trace_request_ctx=span
+            ) as response:
+                status = response.status
+                if response.status == HTTPStatus.UNAUTHORIZED:
+                    raise ExpiredTokenException("Access token is expired or invalid")
+                response.raise_for_status()
+                result = loads(await response.read())
+        except Exception as error:
+            if span is not None:
+                tracer.finish(span, status=status, error=error)
+            raise
+        if span is not None:
+            tracer.finish(span, status=status)
+        return result
+
+    async def close(self):
+        await self.http_client.close()
+
+
+class InMemoryTransport(Transport):
+    """Answers requests from a ``GameModel`` in the same process, without sockets."""
+
+    def __init__(self, model: GameModel, latency: float = 0):
+        self.endpoint = "in-memory"
+        self.model = model
+        self.latency = latency
+        self.access_token: str | None = None
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def set_access_token(self, access_token: str | None):
+        self.access_token = access_token
+
+    async def post(self, body: bytes, operations: tuple[str, ...] = ()) -> Any:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        else:
+            await asyncio.sleep(0)
+        payload = loads(body)
+        operations = payload if isinstance(payload, list) else [payload]
+        results = [
+            self.model.execute(
+                operation.get("operationName"), operation.get("variables"), self.access_token
+            )
+            for operation in operations
+        ]
+        return results if isinstance(payload, list) else results[0]
+
+    async def close(self):
+        self._closed = True
+
+
+TransportFactory = Callable[..., Transport]
+
+_factory: TransportFactory = HttpTransport
+
+
+def use_transport(factory: TransportFactory):
+    """Route every account created afterwards through ``factory(proxy=..., user_agent=...)``."""
+    global _factory
+    _factory = factory
+
+
+def create_transport(proxy: str | None, user_agent: str) -> Transport:
+    return _factory(proxy=proxy, user_agent=user_agent)
@@ -0,0 +1,42 @@
+import json
+
+from bot.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def get_backend() -> str:
+    backend = str(getattr(settings, "JSON_BACKEND", "auto")).lower()
+    if backend == "auto":
+        if orjson is not None:
+            return "orjson"
+        if msgspec is not None:
+            return "msgspec"
+        return "json"
+    if backend == "orjson" and orjson is None or backend == "msgspec" and msgspec is None:
+        raise ImportError(f"JSON_BACKEND is set to {backend} but it is not installed")
+    return backend
+
+
+BACKEND = get_backend()
+
+if BACKEND == "orjson":
+    dumps = orjson.dumps
+    loads = orjson.loads
+elif BACKEND == "msgspec":
+    dumps = msgspec.json.encode
+    loads = msgspec.json.decode
+else:
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+    loads = json.loads
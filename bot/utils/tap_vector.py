@@ -0,0 +1,13 @@
+import random
+
+# 256 is a multiple of 4, so mapping every byte value onto "1".."4" keeps the draw uniform.
+TAP_TABLE = bytes(b"1234"[value % 4] for value in range(256))
+
+
+def generate_tap_vector(taps: int, rng: random.Random | None = None) -> str:
+    if taps <= 0:
+        return ""
+    draws = (rng or random).randbytes(taps).translate(TAP_TABLE)
+    vector = bytearray(b"," * (2 * taps - 1))
+    vector[::2] = draws
+    return vector.decode("ascii")
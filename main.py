@@ -1,27 +1,40 @@
 import argparse
 import asyncio
-import json
+from functools import partial
 import random
-from contextlib import suppress
+from contextlib import contextmanager, suppress
 from datetime import datetime
 from http import HTTPStatus
 from itertools import cycle
+from math import ceil
 import sys
 import requests
 
 from time import time
-from urllib.parse import unquote
 
 import aiohttp
 import pytz
-from aiocfscrape import CloudflareScraper
-from aiohttp_proxy import ProxyConnector
 from better_proxy import Proxy
 
 from bot.config import settings
 from bot.core.agents import generate_random_user_agent
+from bot.core.connections import connector_pool
+from bot.core.game_state import EnergyModel, ProfileState
+from bot.core.graphql_client import GraphQLClient
+from bot.core import metrics
+from bot.core.init_data import TelegramInitData, parse_init_data
+from bot.core.missions import MissionScheduler, mission_index
+from bot.core.profiler import profiler
+from bot.core.quarantine import quarantine, session_age_days
+from bot.core.rate_limiter import is_rate_limit_message
 from bot.core.registrator import register_query_id
-from bot.core.TLS import TLSv1_3_BYPASS
+from bot.core.retry import error_backoff, request_retry
+from bot.core.scheduler import scheduler, startup_ramp
+from bot.core.session_store import session_store, user_agents
+from bot.core.supervisor import ShardSupervisor
+from bot.core.token_manager import token_manager
+from bot.core.tracing import tracer
+from bot.core.transport import HttpTransport, Transport, create_transport
 from bot.exceptions import (
     ErrorStartGameException,
     ExpiredTokenException,
@@ -32,13 +45,12 @@ from bot.exceptions import (
 from bot.utils import logger
 from bot.utils.boosts import FreeBoostType, UpgradableBoostType
 from bot.utils.graphql import OperationName, Query
+from bot.utils.tap_vector import generate_tap_vector
 from helpers import (
     calculate_spin_multiplier,
-    check_complete_task_delay,
     convert_datetime_str_to_utc,
     format_duration,
     get_query_ids,
-    get_tele_user_obj_from_query_id,
     bcolors,
 )
 
@@ -100,7 +112,8 @@ def get_proxies() -> list[Proxy]:
 async def delete_account():
     delete = True
     while delete:
-        query_ids = await get_query_ids()
+        session_store.migrate(await get_query_ids())
+        query_ids = session_store.get_query_ids()
         number_validation = []
         list_of_username = []
         delete_action = None
@@ -110,8 +123,7 @@ async def delete_account():
             print("Please select the session you want to delete. (press enter to exit): ")
             print("")
             for idx, query_id in enumerate(query_ids):
-                tele_user_obj = get_tele_user_obj_from_query_id(query_id)
-                username = tele_user_obj.get("username")
+                username = parse_init_data(query_id).username
                 num = idx + 1
                 print(f"{num}. {username}")
                 list_of_username.append(username)
@@ -131,20 +143,14 @@ async def delete_account():
                     delete_action = int(delete_action)
                     break
 
-            with open("query_ids.txt", "r+") as f:
-                content = f.readlines()
-                content_len = len(content)
+            deleted_query_id = query_ids[delete_action - 1]
+            session_store.delete(deleted_query_id)
+
+            with suppress(FileNotFoundError), open("query_ids.txt", "r+") as f:
+                content = [line.strip() for line in f if line.strip()]
                 f.truncate(0)
                 f.seek(0)
-                index_to_strip = 0
-                for content_idx, line in enumerate(content):
-                    if not content_idx == (delete_action - 1):
-                        if delete_action == content_len:
-                            index_to_strip = delete_action - 2
-                        if index_to_strip and content_idx == index_to_strip:
-                            f.write(line.strip())
-                        else:
-                            f.write(line)
+                f.write("\n".join(line for line in content if line != deleted_query_id))
 
             logger.success(f"Successfully delete session: {list_of_username[delete_action - 1]}")
 
@@ -172,7 +178,34 @@ async def delete_account():
 async def process() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--action", type=int, help="Action to perform")
-    action = parser.parse_args().action
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=int(getattr(settings, "WORKERS", 1)),
+        help="Number of worker processes to shard accounts across",
+    )
+    parser.add_argument(
+        "--trace-sample",
+        type=float,
+        default=None,
+        help="Share of gateway requests to trace, between 0 and 1",
+    )
+    parser.add_argument(
+        "--profile",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Profile the run loop for SECONDS (0 stops only on --profile-cycles or Ctrl+C)",
+    )
+    parser.add_argument(
+        "--profile-cycles",
+        type=int,
+        default=0,
+        help="Stop profiling after this many run loop cycles across all accounts",
+    )
+    args = parser.parse_args()
+    action = args.action
     if not action:
         print(banner)
         total_menu = create_menus()
@@ -191,13 +224,22 @@ async def process() -> None:
     if action == 2:
         await register_query_id()
     if action == 1:
-        await run_tasks()
+        if args.profile is not None:
+            logger.info("Profiling the run loop in a single worker process")
+            await profiler.run(
+                run_tasks(workers=1, trace_sample=args.trace_sample),
+                seconds=args.profile,
+                cycles=args.profile_cycles,
+            )
+        else:
+            await run_tasks(workers=args.workers, trace_sample=args.trace_sample)
     elif action == 3:
         await delete_account()
 
 
-async def run_tasks():
-    query_ids = await get_query_ids()
+async def run_tasks(workers: int = 1, trace_sample: float | None = None):
+    session_store.migrate(await get_query_ids())
+    query_ids = session_store.get_query_ids()
     if not query_ids:
         logger.warning(
             "No query ID found. Please select <lc>Add Session</lc> or add it directly to the <lc>query_ids.txt</lc> file"
@@ -208,47 +250,141 @@ async def run_tasks():
     logger.info(f"Detected <lc>{len(query_ids)}</lc> accounts | <lc>{len(proxies)}</lc> proxies")
     logger.info(f"============================================================")
     proxies_cycle = cycle(proxies) if proxies else None
-    tasks = [
-        asyncio.create_task(
-            run_tapper(
-                query_id=query_id,
-                proxy=next(proxies_cycle) if proxies_cycle else None,
-            )
-        )
-        for query_id in query_ids
+    accounts = [
+        (query_id, next(proxies_cycle) if proxies_cycle else None) for query_id in query_ids
     ]
-    await asyncio.gather(*tasks)
+    workers = min(workers, len(accounts))
+    if workers > 1:
+        logger.info(f"Sharding accounts across <lc>{workers}</lc> worker processes")
+        # SQLite connections must not cross fork(); each shard opens its own.
+        session_store.close()
+        await ShardSupervisor(
+            partial(run_accounts, trace_sample=trace_sample), accounts, workers
+        ).run()
+    else:
+        await run_accounts(accounts, trace_sample=trace_sample)
+
+
+async def validate_sessions(accounts: list[tuple[str, str | None]]):
+    semaphore = asyncio.Semaphore(int(getattr(settings, "SESSION_VALIDATION_CONCURRENCY", 20)))
+
+    async def validate(query_id: str, proxy: str | None):
+        async with semaphore:
+            return await Tapper(query_id=query_id).validate(proxy=proxy)
+
+    results = await asyncio.gather(
+        *(validate(query_id, proxy) for query_id, proxy in accounts), return_exceptions=True
+    )
+    valid = sum(1 for result in results if result is True)
+    logger.info(
+        f"Validated <lc>{len(accounts)}</lc> sessions | Valid: <lg>{valid}</lg> | "
+        f"Failing: <lr>{len(accounts) - valid}</lr>"
+    )
+
+    for (query_id, _), result in zip(accounts, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to validate query id <lc>{query_id[:32]}...</lc>: {result}")
+            continue
+        init_data = parse_init_data(query_id)
+        if quarantine.is_dead(init_data.user_id):
+            state = quarantine.state(init_data.user_id)
+            remaining = quarantine.remaining(init_data.user_id)
+            logger.warning(
+                f"Dead session <light-yellow>{init_data.username or init_data.user_id}</light-yellow> | "
+                f"Failures: <lr>{state['failures']}</lr> | "
+                f"Query id age: <ly>{session_age_days(state['auth_date']):.1f}</ly> days | "
+                f"Retry in <ly>{format_duration(int(remaining))}</ly> | "
+                f"{state['reason']}"
+            )
+
+
+@contextmanager
+def cleanup_step(action: str):
+    try:
+        yield
+    except Exception as error:
+        logger.error(f"Failed to {action}: {error}")
+
+
+async def run_accounts(accounts: list[tuple[str, str | None]], trace_sample: float | None = None):
+    if trace_sample is not None:
+        tracer.sample_rate = trace_sample
+    tasks = []
+    try:
+        await metrics.registry.start()
+        if str(getattr(settings, "VALIDATE_SESSIONS", "true")).lower() == "true":
+            await validate_sessions(accounts)
+        async for query_id, proxy in startup_ramp.ramp(accounts):
+            tasks.append(asyncio.create_task(run_tapper(query_id=query_id, proxy=proxy)))
+        await asyncio.gather(*tasks)
+    finally:
+        # Each step runs even if an earlier one fails, so a bad save never skips the rest.
+        with cleanup_step("save sessions"):
+            session_store.close()
+        with cleanup_step("close connections"):
+            await connector_pool.close()
+        with cleanup_step("stop the metrics server"):
+            await metrics.registry.stop()
+        with cleanup_step("write request traces"):
+            if tracer.dump():
+                logger.info(f"Request traces written to <lc>{tracer.file_name}</lc>")
 
 
 class Tapper:
+    __slots__ = (
+        "query_id",
+        "proxy",
+        "session_name",
+        "init_data",
+        "profile",
+        "login_error_streak",
+        "_transport",
+        "_graphql",
+        "_missions",
+    )
+
     def __init__(self, query_id: str):
         self.query_id = query_id
-        self.user_id = 0
-        self.username = None
-        self.first_name = None
-        self.last_name = None
-        self.fullname = None
-        self.start_param = None
-        self.peer = None
-        self.first_run = None
-        self.login_base_url = "https://gateway.blum.codes/v1/auth/provider"
-        self.base_url = "https://game-domain.blum.codes/api/v1"
-        self.headers = {
-            "Accept": "application/json, text/plain, */*",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Connection": "keep-alive",
-            "Content-Type": "application/json",
-            "Origin": "https://tg-app.memefi.club",
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-site",
-            "Sec-Ch-Ua": '"Google Chrome";v="127", "Chromium";v="127", "Not.A/Brand";v="24"',
-            "Sec-Ch-Ua-Mobile": "?1",
-            "Sec-Ch-Ua-Platform": "Android",
-        }
-        self.session_ug_dict = self.load_user_agents() or []
-        self.access_token_created_time = 0
-        self.GRAPHQL_URL = "https://api-gw-tg.memefi.club/graphql"
+        self.proxy: str | None = None
+        self.session_name: str | None = None
+        self.init_data: TelegramInitData | None = None
+        self.profile = ProfileState(fetch=self.get_profile_data)
+        self.login_error_streak = 0
+        self._transport: Transport | None = None
+        self._graphql: GraphQLClient | None = None
+        self._missions: MissionScheduler | None = None
+
+    @property
+    def transport(self) -> Transport:
+        if self._transport is None or self._transport.closed:
+            self._transport = create_transport(
+                proxy=self.proxy, user_agent=self.check_user_agent()
+            )
+            self._graphql = None
+        return self._transport
+
+    @property
+    def graphql(self) -> GraphQLClient:
+        transport = self.transport
+        if self._graphql is None:
+            self._graphql = GraphQLClient(
+                transport, proxy=self.proxy, account=self.init_data.user_id
+            )
+        return self._graphql
+
+    @property
+    def missions(self) -> MissionScheduler:
+        if self._missions is None:
+            self._missions = MissionScheduler(self)
+        return self._missions
+
+    async def close(self):
+        if self._missions is not None:
+            self._missions.stop()
+        if self._transport is not None:
+            await self._transport.close()
+            self._transport = None
+            self._graphql = None
 
     def logger_error_from_exception(self, action, error):
         if error.status == HTTPStatus.BAD_REQUEST:
@@ -257,6 +393,23 @@ class Tapper:
             self.error(f"<ly>[{action}] - {error}</ly>")
         return None
 
+    async def sleep(self, delay: float):
+        with profiler.idle():
+            await scheduler.sleep(delay)
+
+    async def backoff(self, attempt: int, operation_name: str) -> bool:
+        if not await request_retry.backoff(attempt, sleep=self.sleep):
+            return False
+        metrics.graphql_retries.inc(operation_name)
+        return True
+
+    async def sleep_after_error(self, error: Exception, error_streak: int):
+        delay = error_backoff.delay(error_streak)
+        error_name = type(error).__name__
+        metrics.error_sleeps.inc(self.init_data.user_id, error_name)
+        metrics.error_sleep_seconds.inc(error_name, amount=delay)
+        await self.sleep(delay=delay)
+
     async def generate_random_user_agent(self):
         return generate_random_user_agent(device_type="android", browser_type="chrome")
 
@@ -291,315 +444,295 @@ class Tapper:
         success(f"<light-yellow>{self.session_name}</light-yellow> | ✅ {message}")
 
     def save_user_agent(self):
-        user_agents_file_name = "user_agents.json"
-        if not any(
-            session["session_name"] == self.session_name for session in self.session_ug_dict
-        ):
-            user_agent_str = generate_random_user_agent()
-            self.session_ug_dict.append(
-                {"session_name": self.session_name, "user_agent": user_agent_str}
-            )
-            with open(user_agents_file_name, "w") as user_agents:
-                json.dump(self.session_ug_dict, user_agents, indent=4)
-            self.success("User agent saved successfully")
-            return user_agent_str
-
-    def load_user_agents(self):
-        user_agents_file_name = "user_agents.json"
-        try:
-            with open(user_agents_file_name, "r") as user_agents:
-                session_data = json.load(user_agents)
-                if isinstance(session_data, list):
-                    return session_data
-        except FileNotFoundError:
-            logger.warning("User agents file not found, creating...")
-        except json.JSONDecodeError:
-            logger.warning("User agents file is empty or corrupted.")
-        return []
+        user_agent_str = generate_random_user_agent()
+        user_agents.set(self.init_data.user_id, user_agent_str)
+        self.success("User agent saved successfully")
+        return user_agent_str
 
     def check_user_agent(self):
-        load = next(
-            (
-                session["user_agent"]
-                for session in self.session_ug_dict
-                if session["session_name"] == self.session_name
-            ),
-            None,
-        )
+        load = user_agents.get(self.init_data.user_id)
         if load is None:
             return self.save_user_agent()
         return load
 
-    async def get_access_token(self, http_client: aiohttp.ClientSession, tg_web_data: dict[str]):
+    async def get_access_token(self, login_variables: bytes):
+        data = await self.graphql.execute(
+            OperationName.MutationTelegramUserLogin,
+            Query.MutationTelegramUserLogin,
+            login_variables,
+        )
+        access_token = data["telegramUserLogin"]["access_token"]
+        return access_token
+
+    async def login(self):
+        delay = quarantine.remaining(self.init_data.user_id)
+        if delay:
+            self.warning(
+                "Session is quarantined after repeated login failures | "
+                f"Retry in <ly>{format_duration(int(delay))}</ly>"
+            )
+            await self.close()
+            await self.sleep(delay=delay)
+
         try:
-            resp = await http_client.post(url=self.GRAPHQL_URL, json=tg_web_data)
-            resp.raise_for_status()
-            resp_json = await resp.json()
-            access_token = resp_json["data"]["telegramUserLogin"]["access_token"]
-            return access_token
-        except Exception as error:
+            async with startup_ramp.login():
+                access_token = await self.get_access_token(
+                    login_variables=self.init_data.login_variables
+                )
+        except (InvalidProtocol, ExpiredTokenException) as error:
+            if is_rate_limit_message(str(error)):
+                metrics.logins.inc(self.init_data.user_id, "limited")
+                self.warning(f"Login rate limited: <ly>{error}</ly>")
+                await self.sleep(delay=error_backoff.delay(self.login_error_streak))
+                self.login_error_streak += 1
+                return None
+            delay = quarantine.record_failure(
+                self.init_data.user_id, str(error), self.init_data.auth_date
+            )
+            metrics.logins.inc(self.init_data.user_id, "rejected")
+            self.error(
+                f"Login rejected: {error} | "
+                f"Query id age: <ly>{session_age_days(self.init_data.auth_date):.1f}</ly> days | "
+                f"Retry in <ly>{format_duration(int(delay))}</ly>"
+            )
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            metrics.logins.inc(self.init_data.user_id, "error")
             self.error(f"get_access_token error {error}")
+            await self.sleep(delay=error_backoff.delay(self.login_error_streak))
+            self.login_error_streak += 1
+            return None
+        except Exception as error:
+            delay = quarantine.record_failure(
+                self.init_data.user_id, repr(error), self.init_data.auth_date
+            )
+            metrics.logins.inc(self.init_data.user_id, "error")
+            self.error(
+                f"get_access_token error {error!r} | "
+                f"Retry in <ly>{format_duration(int(delay))}</ly>"
+            )
+            return None
 
-    async def get_profile_data(self, http_client: aiohttp.ClientSession):
-        for _ in range(5):
-            try:
-                json_data = {
-                    "operationName": OperationName.QUERY_GAME_CONFIG,
-                    "query": Query.QUERY_GAME_CONFIG,
-                    "variables": {},
-                }
+        metrics.logins.inc(self.init_data.user_id, "ok")
+        self.login_error_streak = 0
+        quarantine.record_success(self.init_data.user_id)
+        return access_token
 
-                response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-                response.raise_for_status()
+    async def validate(self, proxy: str | None) -> bool:
+        self.proxy = proxy
+        self.init_data = parse_init_data(self.query_id)
+        self.session_name = self.init_data.username
+        if token_manager.get(self.init_data.user_id):
+            return True
+        if quarantine.remaining(self.init_data.user_id):
+            return False
 
-                response_json = await response.json()
+        try:
+            access_token = await self.login()
+        finally:
+            await self.close()
 
-                if "errors" in response_json:
-                    raise InvalidProtocol(
-                        f'get_profile_data msg: {response_json["errors"][0]["message"]}'
-                    )
+        if not access_token:
+            return False
+        token_manager.set(self.init_data.user_id, access_token)
+        return True
+
+    async def get_profile_data(self):
+        for attempt in range(request_retry.attempts):
+            try:
+                data = await self.graphql.execute(
+                    OperationName.QUERY_GAME_CONFIG, Query.QUERY_GAME_CONFIG
+                )
 
-                profile_data = response_json.get("data", {}).get("telegramGameGetConfig", {})
+                profile_data = data.get("telegramGameGetConfig", {})
 
                 if not profile_data:
-                    await asyncio.sleep(delay=3)
+                    if not await self.backoff(attempt, OperationName.QUERY_GAME_CONFIG):
+                        break
                     continue
 
                 return profile_data
+            except ExpiredTokenException as error:
+                raise error
             except Exception as error:
                 self.error(f"Unknown error while getting Profile Data: {error}")
-                await asyncio.sleep(delay=3)
+                if not await self.backoff(attempt, OperationName.QUERY_GAME_CONFIG):
+                    break
 
         return {}
 
-    async def get_bot_config(self, http_client: aiohttp.ClientSession):
-        for _ in range(5):
+    async def get_bot_config(self):
+        for attempt in range(request_retry.attempts):
             try:
-                json_data = {
-                    "operationName": OperationName.TapbotConfig,
-                    "query": Query.TapbotConfig,
-                    "variables": {},
-                }
-
-                response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-                response.raise_for_status()
-
-                response_json = await response.json()
-
-                if "errors" in response_json:
-                    raise InvalidProtocol(
-                        f'get_bot_config msg: {response_json["errors"][0]["message"]}'
-                    )
+                data = await self.graphql.execute(OperationName.TapbotConfig, Query.TapbotConfig)
 
-                bot_config = response_json.get("data", {}).get("telegramGameTapbotGetConfig", {})
+                bot_config = data.get("telegramGameTapbotGetConfig", {})
 
                 if not bot_config:
-                    await asyncio.sleep(delay=3)
+                    if not await self.backoff(attempt, OperationName.TapbotConfig):
+                        break
                     continue
 
                 return bot_config
             except Exception as error:
                 self.error(f"Unknown error while getting TapBot Data: {error}")
-                await asyncio.sleep(delay=3)
+                if not await self.backoff(attempt, OperationName.TapbotConfig):
+                    break
 
         return {}
 
-    async def start_bot(self, http_client: aiohttp.ClientSession):
-        for _ in range(5):
+    async def start_bot(self):
+        for attempt in range(request_retry.attempts):
             try:
-                json_data = {
-                    "operationName": OperationName.TapbotStart,
-                    "query": Query.TapbotStart,
-                    "variables": {},
-                }
-
-                response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-                response.raise_for_status()
-
-                response_json = await response.json()
-
-                if "errors" in response_json:
-                    raise InvalidProtocol(f'start_bot msg: {response_json["errors"][0]["message"]}')
+                data = await self.graphql.execute(OperationName.TapbotStart, Query.TapbotStart)
 
-                start_data = response_json["data"]["telegramGameTapbotStart"]
+                start_data = data["telegramGameTapbotStart"]
 
                 if not start_data:
-                    await asyncio.sleep(delay=3)
+                    if not await self.backoff(attempt, OperationName.TapbotStart):
+                        break
                     continue
 
                 return start_data
             except Exception as error:
                 self.error(f"Unknown error while Starting Bot: {error}")
-                await asyncio.sleep(delay=3)
+                if not await self.backoff(attempt, OperationName.TapbotStart):
+                    break
 
         return None
 
-    async def claim_bot(self, http_client: aiohttp.ClientSession):
-        for _ in range(5):
+    async def claim_bot(self):
+        for attempt in range(request_retry.attempts):
             try:
-                json_data = {
-                    "operationName": OperationName.TapbotClaim,
-                    "query": Query.TapbotClaim,
-                    "variables": {},
-                }
-
-                response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-                response.raise_for_status()
-
-                response_json = await response.json()
+                data = await self.graphql.execute(OperationName.TapbotClaim, Query.TapbotClaim)
 
-                if "errors" in response_json:
-                    raise InvalidProtocol(f'claim_bot msg: {response_json["errors"][0]["message"]}')
-
-                claim_data = response_json.get("data", {}).get("telegramGameTapbotClaimCoins", {})
+                claim_data = data.get("telegramGameTapbotClaimCoins", {})
 
                 if not claim_data:
-                    await asyncio.sleep(delay=3)
+                    if not await self.backoff(attempt, OperationName.TapbotClaim):
+                        break
                     continue
 
                 return claim_data
             except Exception as error:
                 self.error(f"Unknown error while Claiming Bot: {error}")
-                await asyncio.sleep(delay=3)
+                if not await self.backoff(attempt, OperationName.TapbotClaim):
+                    break
 
         return {}
 
-    async def set_next_boss(self, http_client: aiohttp.ClientSession):
+    async def set_next_boss(self):
         try:
-            json_data = {
-                "operationName": OperationName.telegramGameSetNextBoss,
-                "query": Query.telegramGameSetNextBoss,
-                "variables": {},
-            }
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
+            data = await self.graphql.execute(
+                OperationName.telegramGameSetNextBoss, Query.telegramGameSetNextBoss
+            )
 
-            response_json = await response.json()
+            if not self.profile.update(data.get("telegramGameSetNextBoss")):
+                self.profile.invalidate()
 
             return True
         except Exception as error:
             self.error(f"Unknown error while Setting Next Boss: {error}")
-            await asyncio.sleep(delay=3)
+            await self.sleep(delay=request_retry.delay(0))
 
             return False
 
-    async def apply_boost(self, http_client: aiohttp.ClientSession, boost_type: FreeBoostType):
+    async def apply_boost(self, boost_type: FreeBoostType):
         try:
-            json_data = {
-                "operationName": OperationName.telegramGameActivateBooster,
-                "query": Query.telegramGameActivateBooster,
-                "variables": {"boosterType": boost_type},
-            }
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
-
-            response_json = await response.json()
+            data = await self.graphql.execute(
+                OperationName.telegramGameActivateBooster,
+                Query.telegramGameActivateBooster,
+                {"boosterType": boost_type},
+            )
 
-            if "errors" in response_json:
-                raise InvalidProtocol(f'apply_boost msg: {response_json["errors"][0]["message"]}')
+            if not self.profile.update(data.get("telegramGameActivateBooster")):
+                self.profile.invalidate()
 
             return True
         except Exception as error:
             self.error(f"Unknown error while Apply {boost_type} Boost: {error}")
-            await asyncio.sleep(delay=3)
+            await self.sleep(delay=request_retry.delay(0))
 
             return False
 
-    async def play_slotmachine(self, http_client: aiohttp.ClientSession, spin_multiplier: int):
+    async def play_slotmachine(self, spin_multiplier: int):
         try:
-            json_data = {
-                "operationName": OperationName.SlotMachineSpin,
-                "query": Query.SpinSlotMachine,
-                "variables": {"payload": {"spinsCount": spin_multiplier}},
-            }
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
+            data = await self.graphql.execute(
+                OperationName.SlotMachineSpin,
+                Query.SpinSlotMachine,
+                {"payload": {"spinsCount": spin_multiplier}},
+            )
 
-            response_json = await response.json()
+            play_data = data.get("slotMachineSpinV2", {})
 
-            play_data = response_json.get("data", {}).get("slotMachineSpinV2", {})
+            self.profile.update(play_data.get("gameConfig"))
 
             return play_data
         except Exception as err:
             return {}
 
-    async def upgrade_boost(
-        self, http_client: aiohttp.ClientSession, boost_type: UpgradableBoostType
-    ):
+    async def upgrade_boost(self, boost_type: UpgradableBoostType):
         try:
-            json_data = {
-                "operationName": OperationName.telegramGamePurchaseUpgrade,
-                "query": Query.telegramGamePurchaseUpgrade,
-                "variables": {"upgradeType": boost_type},
-            }
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
-
-            response_json = await response.json()
+            data = await self.graphql.execute(
+                OperationName.telegramGamePurchaseUpgrade,
+                Query.telegramGamePurchaseUpgrade,
+                {"upgradeType": boost_type},
+            )
 
-            if "errors" in response_json:
-                raise InvalidProtocol(f'upgrade_boost msg: {response_json["errors"][0]["message"]}')
+            if not self.profile.update(data.get("telegramGamePurchaseUpgrade")):
+                self.profile.invalidate()
 
             return True
         except Exception:
             return False
 
-    async def send_taps(self, http_client: aiohttp.ClientSession, nonce: str, taps: int):
-        for _ in range(5):
+    async def send_taps(self, nonce: str, taps: int):
+        vector = generate_tap_vector(taps)
+        for attempt in range(request_retry.attempts):
             try:
-                vector = []
-
-                for _ in range(taps):
-                    vector.append(str(random.randint(1, 4)))
-
-                vector = ",".join(vector)
-
-                json_data = {
-                    "operationName": OperationName.MutationGameProcessTapsBatch,
-                    "query": Query.MutationGameProcessTapsBatch,
-                    "variables": {
+                data = await self.graphql.execute(
+                    OperationName.MutationGameProcessTapsBatch,
+                    Query.MutationGameProcessTapsBatch,
+                    {
                         "payload": {
                             "nonce": nonce,
                             "tapsCount": taps,
                             "vector": vector,
                         },
                     },
-                }
-
-                response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-                response.raise_for_status()
-
-                response_json = await response.json()
-
-                if "errors" in response_json:
-                    raise InvalidProtocol(f'send_taps msg: {response_json["errors"][0]["message"]}')
+                )
 
-                profile_data = response_json.get("data", {}).get("telegramGameProcessTapsBatch", {})
+                profile_data = data.get("telegramGameProcessTapsBatch", {})
 
                 if not profile_data:
-                    await asyncio.sleep(delay=3)
+                    if not await self.backoff(attempt, OperationName.MutationGameProcessTapsBatch):
+                        break
                     continue
 
+                self.profile.update(profile_data)
+
                 return profile_data
+            except ExpiredTokenException as error:
+                self.profile.invalidate()
+                raise error
             except Exception as error:
                 self.error(f"Unknown error when Tapping: {error}")
-                await asyncio.sleep(delay=3)
+                if not await self.backoff(attempt, OperationName.MutationGameProcessTapsBatch):
+                    break
 
+        # The nonce or energy we tapped with may be stale, so refetch before the next batch.
+        self.profile.invalidate()
         return {}
 
-    async def start_tapbot(self, http_client: aiohttp.ClientSession, bot_config: dict):
+    async def start_tapbot(self, bot_config: dict):
         used_attempts = bot_config.get("usedAttempts", 0)
         total_attempts = bot_config.get("totalAttempts", 0)
 
         if used_attempts < total_attempts:
             logger.info(f"{self.session_name} | Sleep 5s before start the TapBot")
-            await asyncio.sleep(5)
+            await self.sleep(5)
 
-            start_data = await self.start_bot(http_client=http_client)
+            start_data = await self.start_bot()
             if start_data:
                 damage_per_sec = start_data.get("damagePerSec", 0)
                 logger.success(
@@ -612,207 +745,93 @@ class Tapper:
                 f"<ly>{used_attempts}</ly><lw>/</lw><le>{total_attempts}</le>"
             )
 
-    async def purchase_and_start_tapbot(self, http_client: aiohttp.ClientSession, bot_config: dict):
-        status = await self.upgrade_boost(
-            http_client=http_client, boost_type=UpgradableBoostType.TAPBOT
-        )
+    async def purchase_and_start_tapbot(self, bot_config: dict):
+        status = await self.upgrade_boost(boost_type=UpgradableBoostType.TAPBOT)
         if status:
             self.success(f"Successfully purchased TapBot")
-            await asyncio.sleep(1)
-            await self.start_tapbot(http_client, bot_config)
+            await self.sleep(1)
+            await self.start_tapbot(bot_config)
 
-    async def query_video_ad_task(self, http_client: aiohttp.ClientSession):
+    async def query_video_ad_task(self):
         try:
-            json_data = [
-                {
-                    "operationName": OperationName.QueryVideoAdTask,
-                    "variables": {},
-                    "query": Query.QueryVideoAdTask,
-                },
-                {
-                    "operationName": OperationName.getSocialTask,
-                    "variables": {},
-                    "query": Query.getSocialTask,
-                },
-                {
-                    "operationName": OperationName.CampaignLists,
-                    "variables": {},
-                    "query": Query.CampaignLists,
-                },
-            ]
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
-
-            response_json = await response.json()
-
-            if "errors" in response_json:
-                raise InvalidProtocol(
-                    f'query_video_ad_task msg: {response_json["errors"][0]["message"]}'
-                )
+            await asyncio.gather(
+                self.graphql.execute(OperationName.QueryVideoAdTask, Query.QueryVideoAdTask),
+                self.graphql.execute(OperationName.getSocialTask, Query.getSocialTask),
+                self.graphql.execute(OperationName.CampaignLists, Query.CampaignLists),
+            )
 
             return True
         except Exception:
             return False
 
-    async def get_campaign_list(self, http_client: aiohttp.ClientSession):
+    async def get_campaign_list(self):
         try:
-            json_data = [
-                {
-                    "operationName": OperationName.CampaignLists,
-                    "variables": {},
-                    "query": Query.CampaignLists,
-                }
-            ]
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
-
-            response_json = await response.json()
-
-            if isinstance(response_json, dict) and "errors" in response_json:
-                raise InvalidProtocol(f'verify_task msg: {response_json["errors"][0]["message"]}')
-            if isinstance(response_json, list) and "errors" in response_json[0]:
-                raise InvalidProtocol(
-                    f'verify_task msg: {response_json[0]["errors"][0]["message"]}'
-                )
+            data = await self.graphql.execute(OperationName.CampaignLists, Query.CampaignLists)
 
-            return response_json
+            return data.get("campaignLists", {})
         except Exception:
-            return []
+            return {}
 
-    async def get_campaign_task_list(self, http_client: aiohttp.ClientSession, campaign_id: str):
+    async def get_campaign_task_list(self, campaign_id: str):
         try:
-            response_json = []
-            json_data = [
-                {
-                    "operationName": OperationName.GetTasksList,
-                    "variables": {"campaignId": campaign_id},
-                    "query": Query.GetTasksList,
-                }
-            ]
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
-
-            response_json = await response.json()
-
-            if isinstance(response_json, dict) and "errors" in response_json:
-                raise InvalidProtocol(f'verify_task msg: {response_json["errors"][0]["message"]}')
-            if isinstance(response_json, list) and "errors" in response_json[0]:
-                raise InvalidProtocol(
-                    f'verify_task msg: {response_json[0]["errors"][0]["message"]}'
-                )
-
-            if response_json[0].get("data"):
-                response_json = response_json[0].get("data", {}).get("campaignTasks", [])
+            data = await self.graphql.execute(
+                OperationName.GetTasksList, Query.GetTasksList, {"campaignId": campaign_id}
+            )
 
-            return response_json
+            return data.get("campaignTasks", [])
         except Exception:
             return []
 
-    async def get_task_by_id(self, http_client: aiohttp.ClientSession, task_id: str):
+    async def get_task_by_id(self, task_id: str):
         try:
-            response_json = None
-            json_data = [
-                {
-                    "operationName": OperationName.GetTaskById,
-                    "variables": {"taskId": task_id},
-                    "query": Query.GetTaskById,
-                },
-                {
-                    "operationName": OperationName.TwitterProfile,
-                    "variables": {},
-                    "query": Query.TwitterProfile,
-                },
-            ]
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
-
-            response_json = await response.json()
-
-            if isinstance(response_json, dict) and "errors" in response_json:
-                raise InvalidProtocol(f'verify_task msg: {response_json["errors"][0]["message"]}')
-            if isinstance(response_json, list) and "errors" in response_json[0]:
-                raise InvalidProtocol(
-                    f'verify_task msg: {response_json[0]["errors"][0]["message"]}'
-                )
-
-            if response_json[0].get("data"):
-                response_json = response_json[0].get("data", {}).get("campaignTaskGetConfig")
+            data, _ = await asyncio.gather(
+                self.graphql.execute(
+                    OperationName.GetTaskById, Query.GetTaskById, {"taskId": task_id}
+                ),
+                self.graphql.execute(OperationName.TwitterProfile, Query.TwitterProfile),
+                return_exceptions=True,
+            )
+            if isinstance(data, Exception):
+                raise data
 
-            return response_json
+            return data.get("campaignTaskGetConfig")
         except Exception:
             return None
 
-    async def verify_task(self, http_client: aiohttp.ClientSession, task_config_id: str):
+    async def verify_task(self, task_config_id: str, campaign_id: str | None = None):
         try:
-            json_data = [
-                {
-                    "operationName": OperationName.CampaignTaskToVerification,
-                    "variables": {
-                        "taskConfigId": task_config_id,
-                    },
-                    "query": Query.CampaignTaskToVerification,
-                }
-            ]
-
-            async with http_client.post(url=self.GRAPHQL_URL, json=json_data) as response:
-                response.raise_for_status()
-                response_json = await response.json()
-
-                if isinstance(response_json, dict) and "errors" in response_json:
-                    raise InvalidProtocol(f'verify_task msg: {response_json["errors"][0]["message"]}')
-                if isinstance(response_json, list) and "errors" in response_json[0]:
-                    raise InvalidProtocol(
-                        f'verify_task msg: {response_json[0]["errors"][0]["message"]}'
-                    )
-
-                if response_json[0].get("data"):
-                    response_json = (
-                        response_json[0].get("data", {}).get("campaignTaskMoveToVerificationV2")
-                    )
+            data = await self.graphql.execute(
+                OperationName.CampaignTaskToVerification,
+                Query.CampaignTaskToVerification,
+                {"taskConfigId": task_config_id},
+            )
 
-                return response_json
+            return data.get("campaignTaskMoveToVerificationV2")
         except InvalidProtocol as e:
-            if "Campaign is not active" in str(e):  
+            if "Campaign is not active" in str(e):
                 self.warning(f"Campaign is inactive. Skipping verification for task_config_id: {task_config_id}")
+                if campaign_id:
+                    mission_index.mark_campaign_inactive(self.init_data.user_id, campaign_id)
                 return None
-            else: 
+            else:
                 self.error(f"Verification failed: {e}")
-                return None 
+                return None
         except Exception as e:
-            self.error(f"An error occurred during verification: {e}") 
-            return None 
+            self.error(f"An error occurred during verification: {e}")
+            return None
 
-    async def complete_task(self, http_client: aiohttp.ClientSession, user_task_id: str):
+    async def complete_task(self, user_task_id: str):
         try:
             status = []
-            json_data = [
-                {
-                    "operationName": OperationName.CampaignTaskMarkAsCompleted,
-                    "variables": {
-                        "userTaskId": user_task_id,
-                    },
-                    "query": Query.CampaignTaskMarkAsCompleted,
-                }
-            ]
-
-            response = await http_client.post(url=self.GRAPHQL_URL, json=json_data)
-            response.raise_for_status()
-
-            response_json = await response.json()
-
-            if "errors" in response_json:
-                raise InvalidProtocol(f'verify_task msg: {response_json["errors"][0]["message"]}')
+            data = await self.graphql.execute(
+                OperationName.CampaignTaskMarkAsCompleted,
+                Query.CampaignTaskMarkAsCompleted,
+                {"userTaskId": user_task_id},
+            )
 
-            if response_json[0].get("data"):
-                response_json_data = (
-                    response_json[0].get("data", {}).get("campaignTaskMarkAsCompleted", [])
-                )
-                if response_json_data.get("status") == "Completed":
-                    status = True
+            response_json_data = data.get("campaignTaskMarkAsCompleted", {})
+            if response_json_data.get("status") == "Completed":
+                status = True
             return status
         except Exception:
             return False
@@ -828,473 +847,368 @@ class Tapper:
             self.error(f"Proxy: {proxy} | Error: {error}")
 
     async def run(self, proxy: str | None) -> None:
-        if "tgWebAppData" in self.query_id:
-            init_data = unquote(
-                string=self.query_id.split("tgWebAppData=", maxsplit=1)[1].split(
-                    "&tgWebAppVersion", maxsplit=1
-                )[0]
-            )
-        else:
-            init_data = self.query_id
-
         turbo_time = 0
         active_turbo = False
         ends_at_logged_time = 0
-
-        ssl_context = TLSv1_3_BYPASS.create_ssl_context()
-
-        conn = (
-            ProxyConnector().from_url(url=proxy, rdns=True, ssl=ssl_context)
-            if proxy
-            else aiohttp.TCPConnector(ssl=ssl_context)
-        )
-
-        tele_user_obj = get_tele_user_obj_from_query_id(init_data)
-        self.session_name = tele_user_obj.get("username")
-        http_client = CloudflareScraper(headers=self.headers, connector=conn)
-        if proxy:
-            await self.check_proxy(http_client=http_client, proxy=proxy)
-        http_client.headers["User-Agent"] = self.check_user_agent()
+        use_energy_model = str(getattr(settings, "USE_ENERGY_MODEL", "true")).lower() == "true"
+        adaptive_taps = str(getattr(settings, "TAPS_SIZING_MODE", "random")).lower() == "adaptive"
+        startup_reported = False
+        error_streak = 0
+        pending_taps = 0
+
+        self.proxy = proxy
+        self.init_data = parse_init_data(self.query_id)
+        self.session_name = self.init_data.username
+        if proxy and isinstance(self.transport, HttpTransport):
+            await self.check_proxy(http_client=self.transport.http_client, proxy=proxy)
         while True:
+            profiler.cycle()
             try:
-                if time() - self.access_token_created_time >= 3000:
-                    http_client.headers.pop("Authorization", None)
-                    tg_web_data_cust = unquote(init_data)
-                    user_obj = json.loads(
-                        tg_web_data_cust.split("user=", maxsplit=1)[1].split(
-                            "&auth_date", maxsplit=1
-                        )[0]
-                    )
-                    user_id = user_obj.get("id")
-                    first_name = user_obj.get("first_name")
-                    last_name = user_obj.get("last_name")
-                    username = user_obj.get("username")
-
-                    query_id = tg_web_data_cust.split("query_id=", maxsplit=1)[1].split(
-                        "&user", maxsplit=1
-                    )[0]
-                    user_data = tg_web_data_cust.split("user=", maxsplit=1)[1].split(
-                        "&auth_date", maxsplit=1
-                    )[0]
-                    auth_date = tg_web_data_cust.split("auth_date=", maxsplit=1)[1].split(
-                        "&hash", maxsplit=1
-                    )[0]
-                    hash_ = tg_web_data_cust.split("hash=", maxsplit=1)[1]
-
-                    json_data = {
-                        "operationName": OperationName.MutationTelegramUserLogin,
-                        "query": Query.MutationTelegramUserLogin,
-                        "variables": {
-                            "webAppData": {
-                                "auth_date": int(auth_date),
-                                "hash": hash_, "query_id": query_id,
-                                "checkDataString": f"auth_date={auth_date}\nquery_id={query_id}\nuser={user_data}",
-                                "user": {
-                                    "id": user_id,
-                                    "allows_write_to_pm": True,
-                                    "first_name": first_name,
-                                    "last_name": last_name,
-                                    "username": username,
-                                    "language_code": "en",
-                                },
-                            },
-                        },
-                    }
-                    access_token = await self.get_access_token(
-                        http_client=http_client, tg_web_data=json_data
-                    )
+                access_token = token_manager.get(self.init_data.user_id)
+                if not access_token:
+                    profiler.enter("login")
+                    if self._transport is not None:
+                        self._transport.set_access_token(None)
+                    access_token = await self.login()
 
                     if not access_token:
                         continue
 
-                    http_client.headers["Authorization"] = f"Bearer {access_token}"
+                    token_manager.set(self.init_data.user_id, access_token)
 
-                    self.access_token_created_time = time()
+                self.transport.set_access_token(access_token)
 
-                    profile_data = await self.get_profile_data(http_client=http_client)
+                profiler.enter("profile")
+                profile_data = await self.profile.get(
+                    max_age=int(getattr(settings, "PROFILE_MAX_AGE", 300))
+                )
 
-                    balance = profile_data["coinsAmount"]
+                balance = profile_data["coinsAmount"]
+                error_streak = 0
 
-                    nonce = profile_data["nonce"]
+                if not startup_reported:
+                    startup_ramp.mark_ready()
+                    startup_reported = True
 
-                    current_boss = profile_data["currentBoss"]
-                    current_boss_level = current_boss["level"]
-                    boss_max_health = current_boss["maxHealth"]
-                    boss_current_health = current_boss["currentHealth"]
+                nonce = profile_data["nonce"]
 
-                    self.info(
-                        f"Balance: <lc>{balance:,}</lc> | Boss level: <m>{current_boss_level}</m> | "
-                        f"Boss health: <e>{boss_current_health:,}</e> / <r>{boss_max_health:,}</r>"
-                    )
+                current_boss = profile_data["currentBoss"]
+                current_boss_level = current_boss["level"]
+                boss_max_health = current_boss["maxHealth"]
+                boss_current_health = current_boss["currentHealth"]
 
-                    await asyncio.sleep(delay=1.5)
+                self.info(
+                    f"Balance: <lc>{balance:,}</lc> | Boss level: <m>{current_boss_level}</m> | "
+                    f"Boss health: <e>{boss_current_health:,}</e> / <r>{boss_max_health:,}</r>"
+                )
 
-                    if settings.AUTO_PLAY_SPIN.lower() == "true":
-                        spins = profile_data.get("spinEnergyTotal", 0)
-                        while spins > 0:
-                            await asyncio.sleep(delay=1)
+                await self.sleep(delay=1.5)
 
-                            spin_multiplier = calculate_spin_multiplier(spins=spins)
-                            play_data = await self.play_slotmachine(
-                                http_client=http_client, spin_multiplier=spin_multiplier
-                            )
+                if settings.AUTO_PLAY_SPIN.lower() == "true":
+                    profiler.enter("spin")
+                    spins = profile_data.get("spinEnergyTotal", 0)
+                    while spins > 0:
+                        await self.sleep(delay=1)
 
-                            reward_amount = play_data.get("spinResults", [{}])[0].get(
-                                "rewardAmount", 0
-                            )
-                            reward_type = play_data.get("spinResults", [{}])[0].get(
-                                "rewardType", "NO"
-                            )
-                            spins = play_data.get("gameConfig", {}).get("spinEnergyTotal", 0)
-                            balance = play_data.get("gameConfig", {}).get("coinsAmount", 0)
+                        spin_multiplier = calculate_spin_multiplier(spins=spins)
+                        play_data = await self.play_slotmachine(spin_multiplier=spin_multiplier)
 
-                            self.info(
-                                f"Successfully played in slot machine | "
-                                f"Balance: <lc>{balance:,}</lc> (<lg>+{reward_amount:,}</lg> <lm>{reward_type}</lm>) | "
-                                f"Spins: <le>{spins:,}</le> (<lr>-{spin_multiplier:,}</lr>)"
-                            )
+                        reward_amount = play_data.get("spinResults", [{}])[0].get(
+                            "rewardAmount", 0
+                        )
+                        reward_type = play_data.get("spinResults", [{}])[0].get(
+                            "rewardType", "NO"
+                        )
+                        spins = play_data.get("gameConfig", {}).get("spinEnergyTotal", 0)
+                        balance = play_data.get("gameConfig", {}).get("coinsAmount", 0)
+
+                        self.info(
+                            f"Successfully played in slot machine | "
+                            f"Balance: <lc>{balance:,}</lc> (<lg>+{reward_amount:,}</lg> <lm>{reward_type}</lm>) | "
+                            f"Spins: <le>{spins:,}</le> (<lr>-{spin_multiplier:,}</lr>)"
+                        )
 
-                            await asyncio.sleep(delay=1)
+                        await self.sleep(delay=1)
 
+                    profile_data = self.profile.data
+
+                profiler.enter("taps")
+                if use_energy_model:
+                    available_energy = self.profile.energy
+                else:
+                    available_energy = profile_data.get("currentEnergy", 0)
+
+                if pending_taps:
+                    taps, pending_taps = pending_taps, 0
+                elif active_turbo and adaptive_taps:
+                    taps = settings.RANDOM_TAPS_COUNT[1]
+                elif adaptive_taps:
+                    taps = EnergyModel.affordable_taps(
+                        profile_data,
+                        available_energy,
+                        min_taps=settings.RANDOM_TAPS_COUNT[0],
+                        max_taps=settings.RANDOM_TAPS_COUNT[1],
+                    )
+                else:
                     taps = random.randint(
                         a=settings.RANDOM_TAPS_COUNT[0], b=settings.RANDOM_TAPS_COUNT[1]
                     )
 
-                    available_energy = profile_data.get("currentEnergy", 0)
-                    need_energy = taps * profile_data.get("weaponLevel", 0)
-
-                    if active_turbo:
-                        taps += settings.ADD_TAPS_ON_TURBO
-                        need_energy = 0
-                        if time() - turbo_time > 10:
-                            active_turbo = False
-                            turbo_time = 0
-
-                    if need_energy > available_energy:
-                        self.warning(
-                            f"Need more energy: <ly>{available_energy:,}</ly>"
-                            f"<lw>/</lw><le>{need_energy:,}</le> for <lg>{taps:,}</lg> taps"
-                        )
+                need_energy = EnergyModel.tap_cost(profile_data, taps)
+
+                if active_turbo:
+                    taps += settings.ADD_TAPS_ON_TURBO
+                    need_energy = 0
+                    if time() - turbo_time > 10:
+                        active_turbo = False
+                        turbo_time = 0
 
+                if need_energy > available_energy:
+                    self.warning(
+                        f"Need more energy: <ly>{available_energy:,}</ly>"
+                        f"<lw>/</lw><le>{need_energy:,}</le> for <lg>{taps:,}</lg> taps"
+                    )
+
+                    if use_energy_model:
+                        if adaptive_taps:
+                            target_energy = EnergyModel.refill_target(
+                                profile_data, settings.RANDOM_TAPS_COUNT[1]
+                            )
+                        else:
+                            target_energy = need_energy
+                        sleep_between_clicks = max(
+                            ceil(self.profile.seconds_until_energy(target_energy)), 1
+                        )
+                    else:
                         sleep_between_clicks = random.randint(
                             a=settings.SLEEP_BETWEEN_TAP[0], b=settings.SLEEP_BETWEEN_TAP[1]
                         )
 
-                        logger.info(f"Sleep <lw>{sleep_between_clicks:,}</lw>s")
-                        await asyncio.sleep(delay=sleep_between_clicks)
+                    logger.info(f"Sleep <lw>{sleep_between_clicks:,}</lw>s")
+                    await self.sleep(delay=sleep_between_clicks)
 
-                        profile_data = await self.get_profile_data(http_client=http_client)
+                    if not use_energy_model:
+                        self.profile.invalidate()
 
-                        continue
+                    if not adaptive_taps:
+                        pending_taps = taps
+                    continue
 
-                    profile_data = await self.send_taps(
-                        http_client=http_client, nonce=nonce, taps=taps
-                    )
+                profile_data = await self.send_taps(nonce=nonce, taps=taps)
 
-                    if not profile_data:
-                        continue
+                if not profile_data:
+                    continue
 
-                    available_energy = profile_data.get("currentEnergy", 0)
-                    new_balance = profile_data.get("coinsAmount", 0)
-                    calc_taps = new_balance - balance
-                    balance = new_balance
+                available_energy = profile_data.get("currentEnergy", 0)
+                new_balance = profile_data.get("coinsAmount", 0)
+                calc_taps = new_balance - balance
+                balance = new_balance
 
-                    free_boosts = profile_data.get("freeBoosts", {})
-                    turbo_boost_count = free_boosts.get("currentTurboAmount", 0)
-                    energy_boost_count = free_boosts.get("currentRefillEnergyAmount", 0)
+                metrics.taps_sent.inc(self.init_data.user_id, amount=taps)
+                metrics.coins_gained.inc(self.init_data.user_id, amount=max(calc_taps, 0))
+                metrics.energy.set(self.init_data.user_id, value=available_energy)
 
-                    next_tap_level = profile_data.get("weaponLevel", 0) + 1
-                    next_energy_level = profile_data.get("energyLimitLevel", 0) + 1
-                    next_charge_level = profile_data.get("energyRechargeLevel", 0) + 1
+                free_boosts = profile_data.get("freeBoosts", {})
+                turbo_boost_count = free_boosts.get("currentTurboAmount", 0)
+                energy_boost_count = free_boosts.get("currentRefillEnergyAmount", 0)
 
-                    nonce = profile_data.get("nonce", "")
+                next_tap_level = profile_data.get("weaponLevel", 0) + 1
+                next_energy_level = profile_data.get("energyLimitLevel", 0) + 1
+                next_charge_level = profile_data.get("energyRechargeLevel", 0) + 1
 
-                    current_boss = profile_data.get("currentBoss", {})
-                    current_boss_level = current_boss.get("level", 0)
-                    boss_current_health = current_boss.get("currentHealth", 0)
+                nonce = profile_data.get("nonce", "")
 
-                    self.success(
-                        "Successfully tapped! | "
-                        f"Balance: <lc>{balance:,}</lc> (<lg>+{calc_taps}</lg>) | "
-                        f"Boss health: <lr>{boss_current_health:,}</lr> | "
-                        f"Energy: <ly>{available_energy:,}</ly>"
-                    )
+                current_boss = profile_data.get("currentBoss", {})
+                current_boss_level = current_boss.get("level", 0)
+                boss_current_health = current_boss.get("currentHealth", 0)
 
-                    if boss_current_health <= 0:
-                        self.info(f"Setting next boss: <lm>{current_boss_level + 1}</lm> lvl")
+                self.success(
+                    "Successfully tapped! | "
+                    f"Balance: <lc>{balance:,}</lc> (<lg>+{calc_taps}</lg>) | "
+                    f"Boss health: <lr>{boss_current_health:,}</lr> | "
+                    f"Energy: <ly>{available_energy:,}</ly>"
+                )
 
-                        status = await self.set_next_boss(http_client=http_client)
-                        if status is True:
-                            self.success(
-                                f"Successfully setting next boss: "
-                                f"<lm>{current_boss_level + 1}</lm>"
-                            )
+                if boss_current_health <= 0:
+                    profiler.enter("boss")
+                    self.info(f"Setting next boss: <lm>{current_boss_level + 1}</lm> lvl")
 
-                        continue
+                    status = await self.set_next_boss()
+                    if status is True:
+                        self.success(
+                            f"Successfully setting next boss: "
+                            f"<lm>{current_boss_level + 1}</lm>"
+                        )
 
-                    if active_turbo is False:
-                        if (
-                            energy_boost_count > 0
-                            and available_energy < settings.MIN_AVAILABLE_ENERGY
-                            and settings.APPLY_DAILY_ENERGY.lower() == "true"
-                        ):
-                            self.info(
-                                f"Sleep <ly>{format_duration(5)}</ly> before activating daily energy boost"
-                            )
-                            await asyncio.sleep(delay=5)
+                    continue
 
-                            status = await self.apply_boost(
-                                http_client=http_client, boost_type=FreeBoostType.ENERGY
-                            )
-                            if status is True:
-                                self.success(f"Energy boost applied")
+                if active_turbo is False:
+                    profiler.enter("boosts")
+                    if (
+                        energy_boost_count > 0
+                        and available_energy < settings.MIN_AVAILABLE_ENERGY
+                        and settings.APPLY_DAILY_ENERGY.lower() == "true"
+                    ):
+                        self.info(
+                            f"Sleep <ly>{format_duration(5)}</ly> before activating daily energy boost"
+                        )
+                        await self.sleep(delay=5)
 
-                                await asyncio.sleep(delay=1)
+                        status = await self.apply_boost(boost_type=FreeBoostType.ENERGY)
+                        if status is True:
+                            self.success(f"Energy boost applied")
 
-                            continue
+                            await self.sleep(delay=1)
 
-                        if turbo_boost_count > 0 and settings.APPLY_DAILY_TURBO.lower() == "true":
-                            self.info(
-                                f"Sleep <ly>{format_duration(5)}</ly> before activating daily turbo boost"
-                            )
-                            await asyncio.sleep(delay=5)
+                        continue
 
-                            status = await self.apply_boost(
-                                http_client=http_client, boost_type=FreeBoostType.TURBO
-                            )
-                            if status is True:
-                                self.success(f"Turbo boost applied")
+                    if turbo_boost_count > 0 and settings.APPLY_DAILY_TURBO.lower() == "true":
+                        self.info(
+                            f"Sleep <ly>{format_duration(5)}</ly> before activating daily turbo boost"
+                        )
+                        await self.sleep(delay=5)
 
-                                await asyncio.sleep(delay=1)
+                        status = await self.apply_boost(boost_type=FreeBoostType.TURBO)
+                        if status is True:
+                            self.success(f"Turbo boost applied")
 
-                                active_turbo = True
-                                turbo_time = time()
+                            await self.sleep(delay=1)
 
-                            continue
+                            active_turbo = True
+                            turbo_time = time()
 
-                        if settings.USE_TAP_BOT.lower() == "true":
-                            bot_config = await self.get_bot_config(http_client=http_client)
+                        continue
 
-                            is_purchased = bot_config.get("isPurchased", False)
-                            ends_at = bot_config.get("endsAt", None)
+                    if settings.USE_TAP_BOT.lower() == "true":
+                        profiler.enter("tapbot")
+                        bot_config = await self.get_bot_config()
 
-                            if not ends_at:
-                                if is_purchased:
-                                    await self.start_tapbot(http_client, bot_config)
-                                else:
-                                    await self.purchase_and_start_tapbot(http_client, bot_config)
-                            else:
-                                ends_at_date = datetime.strptime(ends_at, "%Y-%m-%dT%H:%M:%S.%f%z")
-                                custom_ends_at_date = ends_at_date.strftime("%d.%m.%Y %H:%M:%S")
-                                ends_at_timestamp = ends_at_date.timestamp()
-
-                                if ends_at_logged_time <= time():
-                                    self.info(f"TapBot ends at: <ly>{custom_ends_at_date}</ly>")
-                                    ends_at_logged_time = time() + 900
-
-                                if ends_at_timestamp < time():
-                                    self.info(
-                                        f"Sleep <ly>{format_duration(5)}</ly> before claim TapBot"
-                                    )
-                                    await asyncio.sleep(5)
-
-                                    claim_data = await self.claim_bot(http_client=http_client)
-                                    if claim_data:
-                                        self.success(f"Successfully claimed TapBot")
-                                        await self.start_tapbot(http_client, bot_config)
-                                elif not is_purchased:
-                                    await self.purchase_and_start_tapbot(http_client, bot_config)
-
-                        if (
-                            settings.AUTO_UPGRADE_TAP.lower() == "true"
-                            and next_tap_level <= settings.MAX_TAP_LEVEL
-                        ):
-                            need_balance = 1000 * (2 ** (next_tap_level - 1))
-
-                            if balance > need_balance:
-                                status = await self.upgrade_boost(
-                                    http_client=http_client, boost_type=UpgradableBoostType.TAP
-                                )
-                                if status is True:
-                                    self.success(f"Tap upgraded to <lm>{next_tap_level}</lm> lvl")
+                        is_purchased = bot_config.get("isPurchased", False)
+                        ends_at = bot_config.get("endsAt", None)
 
-                                    await asyncio.sleep(delay=1)
+                        if not ends_at:
+                            if is_purchased:
+                                await self.start_tapbot(bot_config)
                             else:
-                                self.warning(
-                                    f"Need more gold for upgrade tap to <lm>{next_tap_level}</lm> lvl "
-                                    f"(<lc>{balance}</lc><lw>/</lw><le>{need_balance}</le>)"
-                                )
+                                await self.purchase_and_start_tapbot(bot_config)
+                        else:
+                            ends_at_date = datetime.strptime(ends_at, "%Y-%m-%dT%H:%M:%S.%f%z")
+                            custom_ends_at_date = ends_at_date.strftime("%d.%m.%Y %H:%M:%S")
+                            ends_at_timestamp = ends_at_date.timestamp()
 
-                        if (
-                            settings.AUTO_UPGRADE_ENERGY.lower() == "true"
-                            and next_energy_level <= settings.MAX_ENERGY_LEVEL
-                        ):
-                            need_balance = 1000 * (2 ** (next_energy_level - 1))
-                            if balance > need_balance:
-                                status = await self.upgrade_boost(
-                                    http_client=http_client, boost_type=UpgradableBoostType.ENERGY
-                                )
-                                if status is True:
-                                    self.success(
-                                        f"Energy upgraded to <lm>{next_energy_level}</lm> lvl"
-                                    )
+                            if ends_at_logged_time <= time():
+                                self.info(f"TapBot ends at: <ly>{custom_ends_at_date}</ly>")
+                                ends_at_logged_time = time() + 900
 
-                                    await asyncio.sleep(delay=1)
-                            else:
-                                self.warning(
-                                    f"Need more gold for upgrade energy to <lm>{next_energy_level}</lm> lvl "
-                                    f"(<lc>{balance}</lc><lw>/</lw><le>{need_balance}</le>)"
+                            if ends_at_timestamp < time():
+                                self.info(
+                                    f"Sleep <ly>{format_duration(5)}</ly> before claim TapBot"
                                 )
+                                await self.sleep(5)
+
+                                claim_data = await self.claim_bot()
+                                if claim_data:
+                                    self.success(f"Successfully claimed TapBot")
+                                    await self.start_tapbot(bot_config)
+                            elif not is_purchased:
+                                await self.purchase_and_start_tapbot(bot_config)
+
+                    profiler.enter("upgrades")
+                    if (
+                        settings.AUTO_UPGRADE_TAP.lower() == "true"
+                        and next_tap_level <= settings.MAX_TAP_LEVEL
+                    ):
+                        need_balance = 1000 * (2 ** (next_tap_level - 1))
+
+                        if balance > need_balance:
+                            status = await self.upgrade_boost(boost_type=UpgradableBoostType.TAP)
+                            if status is True:
+                                self.success(f"Tap upgraded to <lm>{next_tap_level}</lm> lvl")
 
-                        if (
-                            settings.AUTO_UPGRADE_CHARGE.lower() == "true"
-                            and next_charge_level <= settings.MAX_CHARGE_LEVEL
-                        ):
-                            need_balance = 1000 * (2 ** (next_charge_level - 1))
+                                await self.sleep(delay=1)
+                        else:
+                            self.warning(
+                                f"Need more gold for upgrade tap to <lm>{next_tap_level}</lm> lvl "
+                                f"(<lc>{balance}</lc><lw>/</lw><le>{need_balance}</le>)"
+                            )
 
-                            if balance > need_balance:
-                                status = await self.upgrade_boost(
-                                    http_client=http_client, boost_type=UpgradableBoostType.CHARGE
+                    if (
+                        settings.AUTO_UPGRADE_ENERGY.lower() == "true"
+                        and next_energy_level <= settings.MAX_ENERGY_LEVEL
+                    ):
+                        need_balance = 1000 * (2 ** (next_energy_level - 1))
+                        if balance > need_balance:
+                            status = await self.upgrade_boost(
+                                boost_type=UpgradableBoostType.ENERGY
+                            )
+                            if status is True:
+                                self.success(
+                                    f"Energy upgraded to <lm>{next_energy_level}</lm> lvl"
                                 )
-                                if status is True:
-                                    self.success(
-                                        f"Charge upgraded to <lm>{next_charge_level}</lm> lvl"
-                                    )
 
-                                    await asyncio.sleep(delay=1)
-                            else:
-                                self.warning(
-                                    f"Need more gold for upgrade charge to <lm>{next_energy_level}</lm> lvl "
-                                    f"(<lc>{balance}</lc><lw>/</lw><le>{need_balance}</le>)"
+                                await self.sleep(delay=1)
+                        else:
+                            self.warning(
+                                f"Need more gold for upgrade energy to <lm>{next_energy_level}</lm> lvl "
+                                f"(<lc>{balance}</lc><lw>/</lw><le>{need_balance}</le>)"
+                            )
+
+                    if (
+                        settings.AUTO_UPGRADE_CHARGE.lower() == "true"
+                        and next_charge_level <= settings.MAX_CHARGE_LEVEL
+                    ):
+                        need_balance = 1000 * (2 ** (next_charge_level - 1))
+
+                        if balance > need_balance:
+                            status = await self.upgrade_boost(
+                                boost_type=UpgradableBoostType.CHARGE
+                            )
+                            if status is True:
+                                self.success(
+                                    f"Charge upgraded to <lm>{next_charge_level}</lm> lvl"
                                 )
 
-                        if settings.AUTO_CLEAR_MISSION.lower() == "true":
-                            campaign_list_resp = await self.get_campaign_list(
-                                http_client=http_client
+                                await self.sleep(delay=1)
+                        else:
+                            self.warning(
+                                f"Need more gold for upgrade charge to <lm>{next_energy_level}</lm> lvl "
+                                f"(<lc>{balance}</lc><lw>/</lw><le>{need_balance}</le>)"
                             )
-                            if campaign_list_resp:
-                                if campaign_list_resp[0].get("data"):
-                                    special_campaign_data = (
-                                        campaign_list_resp[0]
-                                        .get("data", {})
-                                        .get("campaignLists", {})
-                                        .get("special", [])
-                                    )
-                                    normal_campaign_data = (
-                                        campaign_list_resp[0]
-                                        .get("data", {})
-                                        .get("campaignLists", {})
-                                        .get("normal", [])
-                                    )
-                                    for s_c in special_campaign_data:
-                                        parent_c_id = s_c.get("id")
-                                        task_list = await self.get_campaign_task_list(
-                                            http_client=http_client, campaign_id=parent_c_id
-                                        )
-                                        for task in task_list:
-                                            if task.get("status") == "Completed":
-                                                continue
-                                            task_id = task.get("id")
-                                            task_detail = await self.get_task_by_id(
-                                                http_client=http_client, task_id=task_id
-                                            )
-                                            if task_detail:
-                                                complete_delay_sec = 1
-                                                task_name = task_detail.get("name")
-                                                task_detail_id = task_detail.get("id")
-                                                task_status = task.get("status")
-                                                if task_status == "Verification":
-                                                    user_task_id = task_detail.get("userTaskId")
-                                                    complete_available_ts = task_detail.get(
-                                                        "verificationAvailableAt"
-                                                    )
-                                                    complete_delay_sec = check_complete_task_delay(
-                                                        complete_available_ts
-                                                    )
-                                                    if complete_delay_sec < 0:
-                                                        complete_delay_sec = 1
-                                                    await asyncio.sleep(delay=complete_delay_sec)
-                                                    task_completed = await self.complete_task(
-                                                        http_client=http_client,
-                                                        user_task_id=user_task_id,
-                                                    )
-                                                    if task_completed:
-                                                        self.success(
-                                                            f"Successfully completed <lc>{task_name}</lc> quest"
-                                                        )
-                                                else:
-                                                    verification_detail = await self.verify_task(
-                                                        http_client=http_client,
-                                                        task_config_id=task_detail_id,
-                                                    )
-                                                    if verification_detail:
-                                                        self.success(
-                                                            f"Successfully started <lc>{task_name}</lc> quest"
-                                                        )
-                                                    await asyncio.sleep(delay=4)
-
-                                    for n_c in normal_campaign_data:
-                                        parent_n_id = n_c.get("id")
-                                        task_list = await self.get_campaign_task_list(
-                                            http_client=http_client, campaign_id=parent_n_id
-                                        )
-                                        for task in task_list:
-                                            if task.get("status") == "Completed":
-                                                continue
-                                            task_id = task.get("id")
-                                            task_detail = await self.get_task_by_id(
-                                                http_client=http_client, task_id=task_id
-                                            )
-                                            if task_detail:
-                                                complete_delay_sec = 1
-                                                task_name = task_detail.get("name")
-                                                task_detail_id = task_detail.get("id")
-                                                task_status = task.get("status")
-                                                if task_status == "Verification":
-                                                    user_task_id = task_detail.get("userTaskId")
-                                                    complete_available_ts = task_detail.get(
-                                                        "verificationAvailableAt"
-                                                    )
-                                                    complete_delay_sec = check_complete_task_delay(
-                                                        complete_available_ts
-                                                    )
-                                                    if complete_delay_sec < 0:
-                                                        complete_delay_sec = 1
-                                                    await asyncio.sleep(delay=complete_delay_sec)
-                                                    task_completed = await self.complete_task(
-                                                        http_client=http_client,
-                                                        user_task_id=user_task_id,
-                                                    )
-                                                    if task_completed:
-                                                        self.success(
-                                                            f"Successfully completed <lc>{task_name}</lc> quest"
-                                                        )
-                                                else:
-                                                    verification_detail = await self.verify_task(
-                                                        http_client=http_client,
-                                                        task_config_id=task_detail_id,
-                                                    )
-                                                    if verification_detail:
-                                                        self.success(
-                                                            f"Successfully started <lc>{task_name}</lc> quest"
-                                                        )
-                                                    await asyncio.sleep(delay=4)
-
-                        if available_energy < settings.MIN_AVAILABLE_ENERGY:
-                            self.info(f"Minimum energy reached: <ly>{available_energy:,}</ly>")
-
-                            if isinstance(settings.SLEEP_BY_MIN_ENERGY, list):
-                                sleep_time = random.randint(
-                                    a=settings.SLEEP_BY_MIN_ENERGY[0],
-                                    b=settings.SLEEP_BY_MIN_ENERGY[1],
+
+                    if settings.AUTO_CLEAR_MISSION.lower() == "true":
+                        profiler.enter("missions")
+                        await self.missions.discover()
+
+                    profiler.enter(None)
+
+                    if available_energy < settings.MIN_AVAILABLE_ENERGY:
+                        self.info(f"Minimum energy reached: <ly>{available_energy:,}</ly>")
+
+                        if use_energy_model:
+                            if adaptive_taps:
+                                batch_energy = EnergyModel.refill_target(
+                                    profile_data, settings.RANDOM_TAPS_COUNT[1]
                                 )
                             else:
-                                sleep_time = settings.SLEEP_BY_MIN_ENERGY
+                                batch_energy = EnergyModel.tap_cost(
+                                    profile_data, settings.RANDOM_TAPS_COUNT[0]
+                                )
+                            target_energy = max(settings.MIN_AVAILABLE_ENERGY, batch_energy)
+                            sleep_time = max(
+                                ceil(self.profile.seconds_until_energy(target_energy)), 1
+                            )
+                        elif isinstance(settings.SLEEP_BY_MIN_ENERGY, list):
+                            sleep_time = random.randint(
+                                a=settings.SLEEP_BY_MIN_ENERGY[0],
+                                b=settings.SLEEP_BY_MIN_ENERGY[1],
+                            )
+                        else:
+                            sleep_time = settings.SLEEP_BY_MIN_ENERGY
 
-                            self.info(f"Sleep <ly>{format_duration(sleep_time)}</ly>")
-                            await asyncio.sleep(delay=sleep_time)
+                        self.info(f"Sleep <ly>{format_duration(sleep_time)}</ly>")
+                        await self.sleep(delay=sleep_time)
 
-                await asyncio.sleep(delay=1)
+                await self.sleep(delay=1)
 
                 sleep_duration = random.randint(
                     a=settings.SLEEP_BETWEEN_TAP[0], b=settings.SLEEP_BETWEEN_TAP[1]
@@ -1303,38 +1217,46 @@ class Tapper:
                 if active_turbo is True:
                     sleep_duration = settings.ACTIVE_TURBO_DELAY
 
-                self.access_token_created_time = 0
-
                 self.info(f"Delay <ly>{format_duration(sleep_duration)}</ly>")
 
-                await asyncio.sleep(sleep_duration)
+                await self.sleep(sleep_duration)
 
             except InvalidSessionException as error:
+                await self.close()
                 raise error
 
             except ExpiredTokenException as error:
                 self.warning(f"<ly>{error}</ly>")
-                await asyncio.sleep(delay=60)
+                token_manager.invalidate(self.init_data.user_id)
+                await self.sleep_after_error(error, error_streak)
+                error_streak += 1
                 continue
 
             except GameSessionNotFoundException as error:
                 self.warning(f"<ly>{error}</ly>")
-                await asyncio.sleep(delay=60)
+                await self.sleep_after_error(error, error_streak)
+                error_streak += 1
                 continue
 
             except ErrorStartGameException as error:
                 self.warning(f"<ly>{error}</ly>")
-                await asyncio.sleep(delay=60)
+                await self.sleep_after_error(error, error_streak)
+                error_streak += 1
                 continue
 
             except Exception as error:
                 self.error(f"Unknown error: {error}")
-                self.access_token_created_time = 0
-                await asyncio.sleep(delay=60)
+                await self.sleep_after_error(error, error_streak)
+                error_streak += 1
 
 
 async def run_tapper(query_id: str, proxy: str | None):
-    await Tapper(query_id=query_id).run(proxy=proxy)
+    tapper = Tapper(query_id=query_id)
+    async with scheduler.worker():
+        try:
+            await tapper.run(proxy=proxy)
+        finally:
+            await tapper.close()
 
 
 async def main():